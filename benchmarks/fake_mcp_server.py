@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+import threading
+import time
+
+# Stand-in for the Azure MCP server (stdio JSON-RPC). Answers the Bicep schema and
+# "az account list-locations" tools with canned data after an optional delay. Like the real
+# server, tool calls are answered concurrently and may come back out of order.
+
+LOCATIONS = [
+    {"name": "eastus", "displayName": "East US", "regionalDisplayName": "(US) East US"},
+    {"name": "eastus2", "displayName": "East US 2", "regionalDisplayName": "(US) East US 2"},
+    {"name": "westus2", "displayName": "West US 2", "regionalDisplayName": "(US) West US 2"},
+    {"name": "centralindia", "displayName": "Central India", "regionalDisplayName": "(Asia Pacific) Central India"},
+    {"name": "westeurope", "displayName": "West Europe", "regionalDisplayName": "(Europe) West Europe"},
+    {"name": "northeurope", "displayName": "North Europe", "regionalDisplayName": "(Europe) North Europe"},
+    {"name": "uksouth", "displayName": "UK South", "regionalDisplayName": "(Europe) UK South"},
+]
+
+BICEP_PROPERTIES = [
+    {"name": "name", "type": "string", "flags": 9},
+    {"name": "location", "type": "string", "flags": 1},
+    {"name": "tags", "type": "object", "flags": 0},
+]
+
+
+def tool_result(name, arguments):
+    if name.endswith("extension_az"):
+        return {"status": 200, "results": LOCATIONS}
+    return {
+        "status": 200,
+        "results": {"BicepSchemaResult": [{"name": arguments.get("resource-type"), "bodyType": {"properties": BICEP_PROPERTIES}}]},
+    }
+
+
+_write_lock = threading.Lock()
+
+
+def reply(message_id, result):
+    with _write_lock:
+        sys.stdout.write(json.dumps({"jsonrpc": "2.0", "id": message_id, "result": result}) + "\n")
+        sys.stdout.flush()
+
+
+def answer_tool_call(message, latency):
+    time.sleep(latency)
+    params = message["params"]
+    body = tool_result(params["name"], params.get("arguments", {}))
+    reply(message["id"], {"content": [{"type": "text", "text": json.dumps(body)}]})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep before each tool call answer")
+    args = parser.parse_args()
+
+    for line in sys.stdin:
+        message = json.loads(line)
+        if "id" not in message:
+            continue
+        method = message.get("method")
+        if method == "initialize":
+            reply(message["id"], {"protocolVersion": "2024-11-05", "capabilities": {"tools": {}}, "serverInfo": {"name": "fake-azure-mcp", "version": "0"}})
+        elif method == "tools/call":
+            threading.Thread(target=answer_tool_call, args=(message, args.latency), daemon=True).start()
+        else:
+            reply(message["id"], {})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal OpenAI-compatible /v1/chat/completions endpoint. It "parses" the user request with a
+# couple of regexes so the rest of the pipeline gets realistic parameters. Supports "stream": true
+# (server-sent events, with a usage chunk when asked for), and can answer the first
+# rate_limited_requests calls with 429 + Retry-After to exercise client retries.
+
+
+def fake_intent(user_request):
+    name = re.search(r"(?:called|named)\s+([\w.-]+)", user_request)
+    location = re.search(r"\bin\s+([a-z0-9]+)", user_request)
+    if "action" in user_request or "workflow" in user_request:
+        parameters = {"action_name": name.group(1) if name else "ci", "trigger": "push", "workflow_description": "Run the tests"}
+        return {"intent": "create_github_action", "parameters": parameters}
+    parameters = {"resource_type": "resource group"}
+    if name:
+        parameters["name"] = name.group(1)
+    if location:
+        parameters["location"] = location.group(1)
+    return {"intent": "create_resource", "parameters": parameters}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    rate_limited_requests = 0
+    requests_seen = None  # shared [count] per server, guarded by counter_lock
+    counter_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with self.counter_lock:
+            self.requests_seen[0] += 1
+            request_number = self.requests_seen[0]
+        if request_number <= self.rate_limited_requests:
+            error = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+            self._send(429, error, {"retry-after-ms": "50", "retry-after": "1"})
+            return
+
+        content = body["messages"][-1]["content"]
+        match = re.search(r"User Request:\s*(.*)", content, re.DOTALL)
+        user_request = (match.group(1) if match else content).strip()
+        time.sleep(self.latency)
+
+        answer = json.dumps(fake_intent(user_request))
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(answer) // 4, "total_tokens": prompt_tokens + len(answer) // 4}
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            self._send(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunks = [{"role": "assistant", "content": ""}] + [{"content": answer[i:i + 16]} for i in range(0, len(answer), 16)]
+        events = [{**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]} for delta in chunks]
+        events.append({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if body.get("stream_options", {}).get("include_usage"):
+            events.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+        for event in events:
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_fake_openai_server(latency=0.0, rate_limited_requests=0):
+    handler = type("Handler", (FakeOpenAIHandler,), {"latency": latency, "rate_limited_requests": rate_limited_requests, "requests_seen": [0]})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
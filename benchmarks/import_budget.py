@@ -0,0 +1,64 @@
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Commands that must start without the heavy backends
+COMMANDS = {
+    "generate": ["generate", "resource group", "name=budget-rg", "location=eastus"],
+    "validate-cache": ["validate-cache"],
+}
+FORBIDDEN_MODULES = ("openai", "requests", "src.mcp_client", "src.git_manager", "src.intent_analyzer")
+
+
+def measure(args):
+    # -X importtime writes "import time: self [us] | cumulative | module" lines to stderr
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(REPO_ROOT, "main.py"), *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(self_us)
+    return result.returncode, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when CLI startup imports regress")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Maximum total import time per command")
+    parser.add_argument("--runs", type=int, default=3, help="Take the best of this many runs to reduce noise")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for command, command_args in COMMANDS.items():
+        best_ms = None
+        for _ in range(args.runs):
+            returncode, modules = measure(command_args)
+            if returncode != 0:
+                print(f"{command}: exited with {returncode}")
+                failed = True
+                break
+            total_ms = sum(modules.values()) / 1000
+            best_ms = total_ms if best_ms is None else min(best_ms, total_ms)
+        else:
+            forbidden = sorted(name for name in modules if name.split(".")[0] in FORBIDDEN_MODULES or name in FORBIDDEN_MODULES)
+            status = "ok"
+            if forbidden:
+                status = f"imports {', '.join(forbidden)}"
+                failed = True
+            elif best_ms > args.budget_ms:
+                status = f"over budget ({args.budget_ms:.0f}ms)"
+                failed = True
+            print(f"{command:<16} {best_ms:8.1f}ms  {len(modules):4d} modules  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Offline end-to-end benchmark: runs the full pipeline against a fake OpenAI endpoint, a stand-in
+# MCP server and a local bare git remote with a gh shim, and reports per-stage latency percentiles.
+#
+#   python benchmarks/run_benchmark.py --requests 50 --concurrency 8
+#   python benchmarks/run_benchmark.py --compare benchmarks/results/<earlier run>.json
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_openai_server import start_fake_openai_server
+
+GH_SHIM = """#!/bin/sh
+# gh shim for benchmarks: pretend every "gh pr create" succeeds
+echo "https://github.example/pull/1"
+"""
+
+
+def _git(*args, cwd=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True)
+
+
+def setup_environment(workdir, args):
+    remote = os.path.join(workdir, "remote.git")
+    seed = os.path.join(workdir, "seed")
+    _git("init", "--bare", remote)
+    _git("symbolic-ref", "HEAD", "refs/heads/main", cwd=remote)
+    _git("init", seed)
+    _git("checkout", "-b", "main", cwd=seed)
+    with open(os.path.join(seed, "README.md"), "w") as f:
+        f.write("# cloud-resources (benchmark)\n")
+    _git("add", "README.md", cwd=seed)
+    _git("-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-m", "init", cwd=seed)
+    _git("push", remote, "main", cwd=seed)
+
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir)
+    gh_path = os.path.join(bin_dir, "gh")
+    with open(gh_path, "w") as f:
+        f.write(GH_SHIM)
+    os.chmod(gh_path, 0o755)
+
+    server = start_fake_openai_server(args.llm_latency)
+    mcp_command = f"{sys.executable} {os.path.join(BENCHMARKS_DIR, 'fake_mcp_server.py')} --latency {args.mcp_latency}"
+    os.environ.update({
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "AZURE_MCP_COMMAND": mcp_command,
+        "MCP_TRANSPORT": "stdio",
+        "SCHEMA_BUNDLE_PATH": os.path.join(workdir, "no-bundle"),
+        "LOCATION_CACHE_PATH": os.path.join(workdir, "locations.json"),
+        "INTENT_CACHE_PATH": os.path.join(workdir, "intent_cache.sqlite3"),
+        "CLOUD_RESOURCES_REPO_PATH": os.path.join(workdir, "cloud-resources"),
+        "CLOUD_RESOURCES_REPO_URL": remote,
+        "GIT_AUTHOR_NAME": "bench",
+        "GIT_AUTHOR_EMAIL": "bench@example.com",
+        "GIT_COMMITTER_NAME": "bench",
+        "GIT_COMMITTER_EMAIL": "bench@example.com",
+    })
+    return server
+
+
+class StageTimer:
+    def __init__(self):
+        self.records = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.records.setdefault(stage, []).append(seconds)
+
+    def call(self, stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            return self.call(stage, func, *args, **kwargs)
+        return timed
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round((len(ordered) - 1) * fraction))]
+
+
+def summarize(timer, wall_seconds, count):
+    stages = {}
+    for stage, values in timer.records.items():
+        stages[stage] = {
+            "count": len(values),
+            "mean_ms": sum(values) / len(values) * 1000,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p90_ms": percentile(values, 0.90) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return {"requests": count, "wall_s": wall_seconds, "throughput_rps": count / wall_seconds if wall_seconds else 0.0, "stages": stages}
+
+
+def run_single(count):
+    # Same sequence of calls as the interactive flow in main.py, one request at a time
+    from src.azure_utils import get_azure_locations
+    from src.git_manager import handle_git_operations
+    from src.intent_analyzer import parse_intent_with_llm
+    from src.pipeline import build_resource_change
+    from src.terraform_generator import get_resource_schema_from_mcp
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    for i in range(count):
+        request_start = time.perf_counter()
+        # "for the benchmark" keeps the request out of the local grammar so the LLM path is measured
+        parsed = timer.call("parse", parse_intent_with_llm, f"I need a resource group called bench-single-{i} in eastus for the benchmark")
+        parameters = parsed.get("parameters", {})
+        timer.call("schema", get_resource_schema_from_mcp, parameters["resource_type"])
+        timer.call("locations", get_azure_locations)
+        branch_name, content, target_file_path = timer.call("generate", build_resource_change, parameters["resource_type"], parameters)
+        if not timer.call("git", handle_git_operations, branch_name, content, target_file_path):
+            raise RuntimeError(f"git operations failed for {branch_name}")
+        timer.record("total", time.perf_counter() - request_start)
+    return summarize(timer, time.perf_counter() - start, count)
+
+
+def run_prefetch(count):
+    # The interactive flow as main.py runs it: git, locations and the schema overlap the LLM call
+    from src.azure_utils import get_azure_locations
+    from src.git_manager import handle_git_operations
+    from src.intent_analyzer import parse_intent_with_llm
+    from src.intent_grammar import predict_resource_type
+    from src.pipeline import build_resource_change
+    from src.prefetch import Prefetcher
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    for i in range(count):
+        request_start = time.perf_counter()
+        prefetcher = Prefetcher()
+        try:
+            prefetcher.warm_up()
+            user_input = f"I need a resource group called bench-prefetch-{i} in eastus for the benchmark"
+            prefetcher.prefetch_schema(predict_resource_type(user_input))
+            parsed = timer.call("parse", parse_intent_with_llm, user_input)
+            parameters = parsed.get("parameters", {})
+            timer.call("schema", prefetcher.schema, parameters["resource_type"])
+            timer.call("locations", get_azure_locations)
+            branch_name, content, target_file_path = timer.call("generate", build_resource_change, parameters["resource_type"], parameters)
+            if not timer.call("git", handle_git_operations, branch_name, content, target_file_path):
+                raise RuntimeError(f"git operations failed for {branch_name}")
+        finally:
+            prefetcher.close()
+        timer.record("total", time.perf_counter() - request_start)
+    return summarize(timer, time.perf_counter() - start, count)
+
+
+def run_batch(count, concurrency):
+    import src.batch as batch
+
+    timer = StageTimer()
+    originals = {name: getattr(batch, name) for name in ("parse_intent_with_llm", "get_resource_schema_from_mcp", "collect_resource_parameters", "build_resource_change", "handle_git_operations")}
+    stage_names = {
+        "parse_intent_with_llm": "parse",
+        "get_resource_schema_from_mcp": "schema",
+        "collect_resource_parameters": "parameters",
+        "build_resource_change": "generate",
+        "handle_git_operations": "git",
+    }
+    for name, func in originals.items():
+        setattr(batch, name, timer.wrap(stage_names[name], func))
+
+    items = [{"id": f"bench-{i}", "request": f"I need a resource group called bench-batch-{i} in eastus for the benchmark"} for i in range(count)]
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda item: timer.call("total", batch.process_batch_item, item, {}), items))
+    finally:
+        for name, func in originals.items():
+            setattr(batch, name, func)
+
+    failed = [result for result in results if result["status"] != "success"]
+    if failed:
+        raise RuntimeError(f"{len(failed)} batch requests failed, first: {failed[0]}")
+    return summarize(timer, time.perf_counter() - start, count)
+
+
+def compare(current, baseline, max_regression):
+    regressions = []
+    for workload, summary in current["workloads"].items():
+        base_summary = baseline.get("workloads", {}).get(workload)
+        if not base_summary:
+            continue
+        for stage, stats in summary["stages"].items():
+            base_stats = base_summary["stages"].get(stage)
+            if not base_stats or base_stats["p50_ms"] <= 0:
+                continue
+            change = stats["p50_ms"] / base_stats["p50_ms"] - 1
+            print(f"  {workload:8} {stage:10} p50 {base_stats['p50_ms']:9.2f} -> {stats['p50_ms']:9.2f} ms ({change:+.0%})")
+            if change > max_regression:
+                regressions.append(f"{workload}/{stage}")
+    return regressions
+
+
+def print_summary(name, summary):
+    print(f"{name}: {summary['requests']} requests in {summary['wall_s']:.2f}s ({summary['throughput_rps']:.1f} req/s)")
+    for stage, stats in summary["stages"].items():
+        print(f"  {stage:10} p50 {stats['p50_ms']:9.2f}  p90 {stats['p90_ms']:9.2f}  p99 {stats['p99_ms']:9.2f}  mean {stats['mean_ms']:9.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for the Agent AI DevOps pipeline")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per workload")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel requests in the batch workload")
+    parser.add_argument("--workloads", default="single,prefetch,batch", help="Comma-separated workloads to run (single, prefetch, batch)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated LLM response time in seconds")
+    parser.add_argument("--mcp-latency", type=float, default=0.01, help="Simulated MCP tool call time in seconds")
+    parser.add_argument("--output", help="Where to save the results JSON (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed p50 slowdown per stage before --compare fails")
+    args = parser.parse_args(argv)
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip() or "unknown"
+    workdir = tempfile.mkdtemp(prefix="agent-bench-")
+    server = setup_environment(workdir, args)
+    try:
+        results = {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {"requests": args.requests, "concurrency": args.concurrency, "llm_latency": args.llm_latency, "mcp_latency": args.mcp_latency},
+            "workloads": {},
+        }
+        workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+        # Pipeline output is noisy; keep it out of the report
+        with open(os.path.join(workdir, "pipeline.log"), "w") as log:
+            stdout = sys.stdout
+            sys.stdout = log
+            try:
+                if "single" in workloads:
+                    results["workloads"]["single"] = run_single(args.requests)
+                if "prefetch" in workloads:
+                    results["workloads"]["prefetch"] = run_prefetch(args.requests)
+                if "batch" in workloads:
+                    results["workloads"]["batch"] = run_batch(args.requests, args.concurrency)
+            finally:
+                sys.stdout = stdout
+    finally:
+        server.shutdown()
+
+    for name, summary in results["workloads"].items():
+        print_summary(name, summary)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output} (pipeline log in {workdir})")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare} (commit {baseline.get('commit')}):")
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressions over {args.max_regression:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,42 @@
+import argparse
 import sys
-import requests
 
-from src.intent_analyzer import parse_intent_with_llm
-from src.terraform_generator import generate_terraform_code, get_resource_schema_from_mcp
-from src.github_actions_generator import generate_github_action_workflow
-from src.git_manager import handle_git_operations
-from src.azure_utils import get_azure_locations
+# Backends (openai, MCP, git) are imported inside the commands that need them so that
+# "generate" and "validate-cache" start without loading any of them.
 
 def main():
+    from src.prefetch import Prefetcher
+
+    prefetcher = Prefetcher()
+    try:
+        run_interactive(prefetcher)
+    finally:
+        prefetcher.close()
+
+def run_interactive(prefetcher):
+    from src.intent_analyzer import parse_intent_with_llm
+    from src.intent_grammar import predict_resource_type
+    from src.git_manager import handle_git_operations
+    from src.pipeline import ask_interactively, build_github_action_change, build_resource_change, collect_resource_parameters, workflow_spec
+
     print("Hello from Agent AI DevOps! I can help you create and manage cloud resources.")
 
+    # Fetch git and locations while the user types
+    prefetcher.warm_up()
     print("What cloud resource would you like to create today? (e.g., 'an Azure resource group', 'a virtual machine')")
     user_input = input("> ")
 
-    parsed_data = parse_intent_with_llm(user_input)
-    print(f"DEBUG: Parsed Data: {parsed_data}")
+    # Start the schema lookup for the likely resource type while the intent is being parsed
+    prefetcher.prefetch_schema(predict_resource_type(user_input))
+
+    # The streamed LLM answer can also name the resource type before the response is complete
+    def on_field(path, value):
+        if path == ("parameters", "resource_type"):
+            prefetcher.prefetch_schema(value)
+
+    parsed_data = parse_intent_with_llm(user_input, on_field)
     intent = parsed_data.get("intent")
     parameters = parsed_data.get("parameters", {})
-    print(f"DEBUG: Intent: {intent}, Parameters: {parameters}")
 
     if intent == "create_resource":
         resource_type = parameters.get("resource_type")
@@ -25,36 +44,18 @@ def main():
             print("Error: Resource type not identified. Please specify what type of resource you want to create.")
             return
 
-        schema = get_resource_schema_from_mcp(resource_type)
+        schema = prefetcher.schema(resource_type)
         if not schema:
             print(f"Error: Unsupported resource type: {resource_type}")
             return
 
         # Collect missing required parameters
-        for param_name, param_info in schema.items():
-            if param_info["required"] and param_name not in parameters:
-                if param_name == "location":
-                    valid_locations = get_azure_locations()
-                    if not valid_locations:
-                        print("Warning: Could not retrieve valid Azure locations. Proceeding without validation.")
-                        user_provided_value = "india" # Hardcode invalid location for testing
-                    else:
-                        while True:
-                            user_provided_value = "india" # Hardcode invalid location for testing
-                            if user_provided_value.lower() in valid_locations:
-                                break
-                            else:
-                                print(f"Invalid location. Please choose from: {', '.join(valid_locations[:10])}...")
-                else:
-                    user_provided_value = parameters.get(param_name) # Use existing parameter if available
-                    if user_provided_value is None:
-                        user_provided_value = input(f"{param_info['prompt']} ")
-                parameters[param_name] = user_provided_value
+        collect_resource_parameters(schema, parameters, ask_interactively)
 
         print(f"Generating Terraform code for {resource_type}...")
-        tf_code_to_add = generate_terraform_code(resource_type, parameters)
+        branch_name, tf_code_to_add, target_file_path = build_resource_change(resource_type, parameters)
         print("Terraform code generated. Ready for Git operations.")
-        handle_git_operations(f"feat-azure-{resource_type.replace(' ', '-')}-{parameters.get('name')}", tf_code_to_add, "main.tf")
+        handle_git_operations(branch_name, tf_code_to_add, target_file_path)
     elif intent == "create_github_action":
         print("Okay, you want to create a GitHub Action.")
 
@@ -70,15 +71,181 @@ def main():
             workflow_description = input("Briefly describe what this action should do: ")
 
         print(f"Generating GitHub Action workflow for '{action_name}'...")
-        workflow_content = generate_github_action_workflow(action_name, trigger, workflow_description)
-        
-        # Define the target file path for the GitHub Action workflow
-        target_file_path = f".github/workflows/{action_name.lower().replace(' ', '-')}.yml"
+        try:
+            branch_name, workflow_content, target_file_path = build_github_action_change(action_name, trigger, workflow_description, workflow_spec(parameters))
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
 
         print("GitHub Action workflow generated. Ready for Git operations.")
-        handle_git_operations(f"feat-github-action-{action_name.lower().replace(' ', '-')}", workflow_content, target_file_path)
+        handle_git_operations(branch_name, workflow_content, target_file_path)
     else:
         print("I'm not sure how to create that resource yet. Please try describing it differently.")
 
+def generate(resource_type, assignments, output=None):
+    from src.terraform_templates import get_template
+
+    template = get_template(resource_type)
+    if not template:
+        print(f"Error: Unsupported resource type: {resource_type}", file=sys.stderr)
+        return 1
+
+    parameters = {}
+    for assignment in assignments:
+        name, separator, value = assignment.partition("=")
+        if not separator:
+            print(f"Error: Expected name=value, got '{assignment}'", file=sys.stderr)
+            return 1
+        parameters[name] = value
+
+    missing = [name for name, info in template.parameters.items() if name not in parameters and info.get("default") is None]
+    if missing:
+        print(f"Error: Missing parameters for {resource_type}: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    try:
+        code = template.render(parameters)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if output:
+        with open(output, "w") as f:
+            f.write(code)
+    else:
+        sys.stdout.write(code)
+    return 0
+
+def workflow(action_name, trigger, description, spec, output=None):
+    from src.github_actions_generator import generate_github_action_workflow
+
+    try:
+        workflow_yaml = generate_github_action_workflow(action_name, trigger, description, {key: value for key, value in spec.items() if value is not None})
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if output:
+        with open(output, "w") as f:
+            f.write(workflow_yaml)
+    else:
+        sys.stdout.write(workflow_yaml)
+    return 0
+
+def validate_cache():
+    import json
+    import os
+    import time
+    from src.config import INTENT_CACHE_PATH, LOCATION_CACHE_PATH, LOCATION_CACHE_TTL, SCHEMA_BUNDLE_PATH
+    from src.schema_bundle import SchemaBundle
+    from src.terraform_templates import TEMPLATE_REGISTRY
+
+    healthy = True
+    if os.path.exists(SCHEMA_BUNDLE_PATH):
+        try:
+            bundle = SchemaBundle(SCHEMA_BUNDLE_PATH)
+            missing = [template.bicep_type for template in TEMPLATE_REGISTRY.values() if not bundle.get(template.bicep_type)]
+            print(f"Schema bundle {SCHEMA_BUNDLE_PATH}: {len(bundle)} resource types")
+            if missing:
+                print(f"  Missing supported types: {', '.join(missing)}")
+                healthy = False
+            bundle.close()
+        except (OSError, ValueError) as e:
+            print(f"Schema bundle {SCHEMA_BUNDLE_PATH}: unreadable ({e})")
+            healthy = False
+    else:
+        print(f"Schema bundle {SCHEMA_BUNDLE_PATH}: not built (run 'python -m src.schema_bundle')")
+
+    if os.path.exists(LOCATION_CACHE_PATH):
+        try:
+            with open(LOCATION_CACHE_PATH) as f:
+                cached = json.load(f)
+            age = time.time() - cached["fetched_at"]
+            state = "fresh" if age <= LOCATION_CACHE_TTL else "stale"
+            print(f"Location cache {LOCATION_CACHE_PATH}: {len(cached['locations'])} locations, {age / 3600:.1f}h old ({state})")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Location cache {LOCATION_CACHE_PATH}: unreadable ({e})")
+            healthy = False
+    else:
+        print(f"Location cache {LOCATION_CACHE_PATH}: empty")
+
+    if os.path.exists(INTENT_CACHE_PATH):
+        from src.response_cache import ResponseCache
+        try:
+            print(f"Intent cache {INTENT_CACHE_PATH}: {len(ResponseCache(INTENT_CACHE_PATH))} entries")
+        except Exception as e:
+            print(f"Intent cache {INTENT_CACHE_PATH}: unreadable ({e})")
+            healthy = False
+    else:
+        print(f"Intent cache {INTENT_CACHE_PATH}: empty")
+
+    return 0 if healthy else 1
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Agent AI DevOps")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    commands.add_parser("interactive", help="Describe one resource or GitHub Action and answer prompts (default)")
+
+    batch_parser = commands.add_parser("batch", help="Process requests from a JSONL/YAML file without prompting")
+    batch_parser.add_argument("file", help="JSONL/YAML file, or '-' for JSONL on stdin")
+    batch_parser.add_argument("--concurrency", type=int, default=4, help="Number of requests processed in parallel")
+    batch_parser.add_argument("--changeset", action="store_true", help="Collect results into grouped commits on one branch with a single push and PR")
+    batch_parser.add_argument("--report", metavar="FILE", help="Write the per-request report (JSONL) here instead of stdout")
+
+    serve_parser = commands.add_parser("serve", help="Run as a long-lived HTTP service with warm caches")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port")
+    serve_parser.add_argument("--socket", metavar="PATH", help="Serve on a Unix socket instead of TCP")
+
+    generate_parser = commands.add_parser("generate", help="Render Terraform for a resource type offline (no LLM, MCP or git)")
+    generate_parser.add_argument("resource_type", help="Resource type, e.g. 'resource group'")
+    generate_parser.add_argument("parameters", nargs="*", metavar="name=value", help="Template parameters")
+    generate_parser.add_argument("--output", metavar="FILE", help="Write to FILE instead of stdout")
+
+    workflow_parser = commands.add_parser("workflow", help="Render a GitHub Actions workflow offline (no LLM or git)")
+    workflow_parser.add_argument("action_name", help="Workflow name, e.g. ci")
+    workflow_parser.add_argument("--trigger", default="push, pull_request", help="Comma-separated events")
+    workflow_parser.add_argument("--description", default="", help="Free-text description; fills options not given below")
+    workflow_parser.add_argument("--language", help="python, node, go or java")
+    workflow_parser.add_argument("--test-command", help="Test command (default depends on the language)")
+    workflow_parser.add_argument("--lint-command", help="Lint command, run as a parallel job")
+    workflow_parser.add_argument("--deploy-target", help="none, azure-webapp, container or terraform")
+    workflow_parser.add_argument("--shards", type=int, help="Split the tests over this many parallel jobs")
+    workflow_parser.add_argument("--paths", nargs="+", help="Only run for changes to these paths")
+    workflow_parser.add_argument("--terraform", action="store_true", default=None, help="Add Terraform plan/apply jobs")
+    workflow_parser.add_argument("--output", metavar="FILE", help="Write to FILE instead of stdout")
+
+    commands.add_parser("validate-cache", help="Check the schema bundle, location cache and intent cache")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        from src.batch import run_batch
+        results = run_batch(args.file, args.concurrency, args.report, args.changeset)
+        if results is None:
+            return 1
+        return 0 if all(result["status"] == "success" for result in results) else 1
+    if args.command == "serve":
+        from src.service import serve
+        serve(args.host, args.port, args.socket)
+        return 0
+    if args.command == "generate":
+        return generate(args.resource_type, args.parameters, args.output)
+    if args.command == "workflow":
+        spec = {
+            "language": args.language,
+            "test_command": args.test_command,
+            "lint_command": args.lint_command,
+            "deploy_target": args.deploy_target,
+            "shards": args.shards,
+            "paths": args.paths,
+            "terraform": args.terraform,
+        }
+        return workflow(args.action_name, args.trigger, args.description, spec, args.output)
+    if args.command == "validate-cache":
+        return validate_cache()
+
+    main()
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli())
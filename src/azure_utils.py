@@ -1,38 +1,178 @@
-import requests
+import difflib
 import json
-import subprocess
+import os
+import re
+import threading
+import time
+
+from src.config import AZURE_MCP_AZ_TOOL, LOCATION_CACHE_PATH, LOCATION_CACHE_TTL, LOCATION_RETRY_INTERVAL
+from src.mcp_client import MCPError, get_mcp_client
+from src.tracing import span
+
+# Friendly names people type that are not Azure display names
+LOCATION_ALIASES = {
+    "india": "centralindia",
+    "us": "eastus",
+    "usa": "eastus",
+    "unitedstates": "eastus",
+    "europe": "westeurope",
+    "netherlands": "westeurope",
+    "ireland": "northeurope",
+    "uk": "uksouth",
+    "unitedkingdom": "uksouth",
+    "germany": "germanywestcentral",
+    "france": "francecentral",
+    "japan": "japaneast",
+    "korea": "koreacentral",
+    "asia": "southeastasia",
+    "singapore": "southeastasia",
+    "hongkong": "eastasia",
+    "australia": "australiaeast",
+    "canada": "canadacentral",
+    "brazil": "brazilsouth",
+    "uae": "uaenorth",
+    "southafrica": "southafricanorth",
+}
+
+
+def _normalize_location(value):
+    return re.sub(r"[^a-z0-9]", "", str(value).lower())
+
+
+def _fetch_locations():
+    # Run "az account list-locations" through the long-lived Azure MCP session
+    output = get_mcp_client().call_tool(AZURE_MCP_AZ_TOOL, {"command": "account list-locations"})
+
+    locations = []
+    if output and output.get("results"):
+        for loc in output["results"]:
+            if loc.get("name"):
+                locations.append({
+                    "name": loc["name"],
+                    "displayName": loc.get("displayName"),
+                    "regionalDisplayName": loc.get("regionalDisplayName"),
+                })
+    return locations
+
+
+class LocationCatalog:
+    def __init__(self, cache_path=LOCATION_CACHE_PATH, ttl=LOCATION_CACHE_TTL, retry_interval=LOCATION_RETRY_INTERVAL):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._failed_at = None
+        self._names = []
+        self._index = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        # Serializes the first load so a prefetch and a foreground lookup share one fetch
+        self._load_lock = threading.Lock()
+        self._refresh_thread = None
+
+    def _set_locations(self, locations, fetched_at):
+        index = {}
+        for loc in locations:
+            name = loc["name"]
+            for key in (name, loc.get("displayName"), loc.get("regionalDisplayName")):
+                if key:
+                    index.setdefault(_normalize_location(key), name)
+        for alias, name in LOCATION_ALIASES.items():
+            if _normalize_location(name) in index:
+                index.setdefault(alias, name)
+
+        with self._lock:
+            self._names = [loc["name"] for loc in locations]
+            self._index = index
+            self._fetched_at = fetched_at
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            self._set_locations(cached["locations"], cached["fetched_at"])
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(self.cache_path):
+                print(f"Warning: Ignoring unreadable location cache {self.cache_path}: {e}")
+            return False
+
+    def refresh(self):
+        try:
+            with span("locations.refresh") as refresh_span:
+                locations = _fetch_locations()
+                refresh_span.set(count=len(locations))
+        except MCPError as e:
+            print(f"Error calling Azure MCP: {e}")
+            return False
+        except Exception as e:
+            print(f"Error getting Azure locations: {e}")
+            return False
+        if not locations:
+            return False
+
+        fetched_at = time.time()
+        self._set_locations(locations, fetched_at)
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"fetched_at": fetched_at, "locations": locations}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write location cache {self.cache_path}: {e}")
+        return True
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+            self._refresh_thread.start()
+
+    def ensure_loaded(self):
+        if not self._index:
+            with self._load_lock:
+                if not self._index and not self._load_cache():
+                    # Nothing to serve yet, so the first fetch has to be synchronous. After a failure,
+                    # lookups run without locations until the retry interval has passed instead of
+                    # each waiting on MCP again.
+                    if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval:
+                        return
+                    self._failed_at = None if self.refresh() else time.monotonic()
+                    return
+        if time.time() - self._fetched_at > self.ttl:
+            self.refresh_in_background()
+
+    def names(self):
+        self.ensure_loaded()
+        return list(self._names)
+
+    def resolve(self, value):
+        self.ensure_loaded()
+        return self._index.get(_normalize_location(value))
+
+    def suggest(self, value, limit=5):
+        self.ensure_loaded()
+        matches = difflib.get_close_matches(_normalize_location(value), list(self._index), n=limit * 2, cutoff=0.6)
+        suggestions = []
+        for match in matches:
+            name = self._index[match]
+            if name not in suggestions:
+                suggestions.append(name)
+        return suggestions[:limit]
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_location_catalog():
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = LocationCatalog()
+        return _catalog
 
 
 def get_azure_locations():
-    try:
-        # Execute the npx command to get Azure locations
-        command = ["npx", "-y", "@azure/mcp@latest", "extension", "az", "--command", "account list-locations"]
-        process = subprocess.run(command, capture_output=True, text=True, check=True)
-        
-        # Parse the JSON output, handling potential non-JSON output
-        output_str = process.stdout.strip()
-        json_start = output_str.find('{')
-        json_end = output_str.rfind('}')
-        
-        if json_start == -1 or json_end == -1:
-            print(f"Error: Could not find JSON in npx output: {output_str}")
-            return []
-
-        json_str = output_str[json_start : json_end + 1]
-        output = json.loads(json_str)
-        
-        locations = []
-        if output and output.get("results"):
-            for loc in output["results"]:
-                if loc.get("name"):
-                    locations.append(loc["name"])
-        return locations
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing npx command: {e.stderr}")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from npx output: {e}")
-        return []
-    except Exception as e:
-        print(f"Error getting Azure locations: {e}")
-        return []
+    return get_location_catalog().names()
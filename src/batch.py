@@ -0,0 +1,197 @@
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from src.changeset import Changeset
+from src.git_manager import BranchInUseError, handle_git_operations
+from src.intent_analyzer import get_intent_stats, parse_intent_with_llm
+from src.pipeline import build_github_action_change, build_resource_change, collect_resource_parameters, workflow_spec
+from src.terraform_generator import get_resource_schema_from_mcp
+from src.tracing import span
+
+GITHUB_ACTION_DEFAULTS = {
+    "trigger": "push",
+    "workflow_description": "Generated by Agent AI DevOps",
+}
+
+
+def _load_yaml(stream):
+    try:
+        import yaml
+    except ImportError:
+        raise RuntimeError("YAML batch files need PyYAML. Install it with 'pip install pyyaml' or use JSONL.")
+    return yaml.safe_load(stream)
+
+
+def iter_batch_items(stream, name=""):
+    # Yields ("defaults", dict) and ("item", dict) entries. A YAML/JSON document is
+    # {"defaults": {...}, "requests": [...]} or a plain list; JSONL is one request per line,
+    # where a line holding only "defaults" updates the defaults for the lines after it.
+    if name.endswith((".yaml", ".yml")):
+        document = _load_yaml(stream)
+        if isinstance(document, dict):
+            yield "defaults", document.get("defaults", {})
+            document = document.get("requests", [])
+        for item_number, item in enumerate(document or [], start=1):
+            if isinstance(item, str):
+                item = {"request": item}
+            if not isinstance(item, dict):
+                yield "item", {"id": f"item-{item_number}", "error": f"Invalid request entry: {item!r}"}
+                continue
+            # Like JSONL's line-N, so every report line and changeset flush has an id to match on
+            item = dict(item)
+            item.setdefault("id", f"item-{item_number}")
+            yield "item", item
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield "item", {"id": f"line-{line_number}", "error": f"Invalid JSON: {e}"}
+            continue
+        if isinstance(entry, str):
+            entry = {"request": entry}
+        if not isinstance(entry, dict):
+            yield "item", {"id": f"line-{line_number}", "error": f"Invalid request entry: {entry!r}"}
+            continue
+        if set(entry) == {"defaults"}:
+            yield "defaults", entry["defaults"]
+        else:
+            entry.setdefault("id", f"line-{line_number}")
+            yield "item", entry
+
+
+def process_batch_item(item, defaults, changeset=None):
+    with span("batch.item", id=item.get("id")) as item_span:
+        result = _process_batch_item(item, defaults, changeset)
+        item_span.set(status=result["status"])
+        return result
+
+
+def _process_batch_item(item, defaults, changeset):
+    result = {"id": item.get("id"), "status": "error"}
+    if item.get("error"):
+        result["error"] = item["error"]
+        return result
+
+    try:
+        if item.get("intent"):
+            intent = item["intent"]
+            parameters = {}
+        else:
+            parsed_data = parse_intent_with_llm(item.get("request", ""))
+            intent = parsed_data.get("intent")
+            parameters = parsed_data.get("parameters", {})
+        # Values given explicitly in the batch file win over what the LLM extracted
+        parameters.update(item.get("parameters", {}))
+        result["intent"] = intent
+
+        if intent == "create_resource":
+            resource_type = parameters.get("resource_type")
+            result["resource_type"] = resource_type
+            if not resource_type:
+                result["error"] = "Resource type not identified"
+                return result
+
+            schema = get_resource_schema_from_mcp(resource_type)
+            if not schema:
+                result["error"] = f"Unsupported resource type: {resource_type}"
+                return result
+
+            missing = collect_resource_parameters(schema, parameters, lambda param_name, param_info: defaults.get(param_name), interactive=False)
+            if missing:
+                result["status"] = "missing_parameters"
+                result["missing"] = missing
+                return result
+            branch_name, content, target_file_path = build_resource_change(resource_type, parameters)
+        elif intent == "create_github_action":
+            action_name = parameters.get("action_name") or defaults.get("action_name")
+            if not action_name:
+                result["status"] = "missing_parameters"
+                result["missing"] = ["action_name"]
+                return result
+            trigger = parameters.get("trigger") or defaults.get("trigger") or GITHUB_ACTION_DEFAULTS["trigger"]
+            workflow_description = parameters.get("workflow_description") or defaults.get("workflow_description") or GITHUB_ACTION_DEFAULTS["workflow_description"]
+            spec = workflow_spec(parameters, defaults)
+            branch_name, content, target_file_path = build_github_action_change(action_name, trigger, workflow_description, spec)
+        else:
+            result["error"] = f"Unknown intent: {intent}"
+            return result
+
+        result["generated_file"] = target_file_path
+        if changeset is not None:
+            changeset.add(target_file_path, content, branch_name, item.get("id"))
+            result["status"] = "staged"
+            return result
+
+        result["branch"] = branch_name
+        # Each request gets its own worktree, so git operations run in parallel too
+        try:
+            pushed = handle_git_operations(branch_name, content, target_file_path)
+        except BranchInUseError as e:
+            result["status"] = "branch_in_use"
+            result["error"] = str(e)
+            return result
+        result["status"] = "success" if pushed else "git_failed"
+        return result
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+
+def run_batch(source, concurrency=4, report_path=None, use_changeset=False):
+    # Returns the per-request results, or None if the batch file could not be read
+    try:
+        stream = sys.stdin if source == "-" else open(source)
+    except OSError as e:
+        print(f"Error: Could not read batch file {source}: {e.strerror}", file=sys.stderr)
+        return None
+    changeset = Changeset() if use_changeset else None
+    defaults = {}
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            for kind, entry in iter_batch_items(stream, "" if source == "-" else source):
+                if kind == "defaults":
+                    defaults = {**defaults, **(entry or {})}
+                else:
+                    futures.append(executor.submit(process_batch_item, entry, dict(defaults), changeset))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    results = [future.result() for future in futures]
+
+    if changeset is not None:
+        changeset.close()
+        flushed = {}
+        for flush in changeset.flushes:
+            for change_id in flush["ids"]:
+                flushed[change_id] = flush
+        for result in results:
+            flush = flushed.get(result["id"])
+            if result["status"] == "staged" and flush:
+                result["branch"] = flush["branch"]
+                result["status"] = "success" if flush["success"] else "git_failed"
+        print(f"Changeset: {len(changeset.flushes)} branch(es) pushed for {len(flushed)} change(s).", file=sys.stderr)
+
+    report = open(report_path, "w") if report_path else sys.stdout
+    try:
+        for result in results:
+            report.write(json.dumps(result) + "\n")
+    finally:
+        if report is not sys.stdout:
+            report.close()
+
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    print(f"Batch finished: {succeeded}/{len(results)} requests succeeded.", file=sys.stderr)
+    stats = get_intent_stats()
+    print(f"Intent parsing: {stats['local']} local, {stats['cache']} cached, {stats['llm']} LLM calls ({stats['hit_rate']:.0%} answered without the LLM).", file=sys.stderr)
+    usage = stats["llm_usage"]
+    if usage["calls"] or usage["coalesced"]:
+        print(f"LLM usage: {usage['calls']} calls ({usage['coalesced']} coalesced, {usage['retries']} retries), {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens, {usage['latency_s']:.2f}s total.", file=sys.stderr)
+    return results
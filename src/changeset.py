@@ -0,0 +1,86 @@
+import threading
+import time
+
+from src.config import CHANGESET_MAX_AGE, CHANGESET_MAX_FILES
+from src.git_manager import publish_branch
+
+WORKFLOWS_DIR = ".github/workflows/"
+
+
+def _change_group(target_file_path):
+    return "workflows" if target_file_path.startswith(WORKFLOWS_DIR) else "terraform"
+
+
+class Changeset:
+    # Staging area for generated files from many requests. Staged changes are flushed as one
+    # branch with one commit per group (Terraform, workflows), a single push and a single PR,
+    # once max_files changes are staged or the oldest one has waited max_age seconds.
+    def __init__(self, max_files=CHANGESET_MAX_FILES, max_age=CHANGESET_MAX_AGE):
+        self.max_files = max_files
+        self.max_age = max_age
+        self.flushes = []
+        self._pending = []
+        self._timer = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+        # Flushes are serialized so batches reach the remote in the order they were staged
+        self._flush_lock = threading.Lock()
+
+    def add(self, target_file_path, content, description, change_id=None):
+        with self._lock:
+            self._pending.append({"path": target_file_path, "content": content, "description": description, "id": change_id})
+            if self._timer is None and self.max_age > 0:
+                self._timer = threading.Timer(self.max_age, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            full = len(self._pending) >= self.max_files
+        if full:
+            self.flush()
+
+    def _take_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._sequence += 1
+            return pending, self._sequence
+
+    def flush(self):
+        with self._flush_lock:
+            pending, sequence = self._take_pending()
+            if not pending:
+                return None
+
+            groups = {}
+            for change in pending:
+                files, descriptions = groups.setdefault(_change_group(change["path"]), ([], []))
+                if not change["path"].endswith(".tf"):
+                    # A later version of the same workflow replaces the earlier one
+                    files[:] = [(path, content) for path, content in files if path != change["path"]]
+                # Terraform changes stay separate and are merged in order, so identical template
+                # labels from two requests are relabelled per change instead of clashing
+                files.append((change["path"], change["content"]))
+                descriptions.append(change["description"])
+
+            commits = []
+            for group, (files, descriptions) in sorted(groups.items()):
+                summary = "\n".join(f"- {description}" for description in descriptions)
+                commits.append((f"Feat: add {len(descriptions)} {group} change(s)\n\n{summary}", files))
+
+            branch_name = f"feat-changeset-{time.strftime('%Y%m%d-%H%M%S')}-{sequence}"
+            pr_title = f"Feat: {len(pending)} generated change(s)"
+            pr_body = "This PR was assembled by the AI agent from these requests:\n\n" + "\n".join(f"- {change['description']}" for change in pending)
+            success = publish_branch(branch_name, commits, pr_title, pr_body)
+
+            flush = {
+                "branch": branch_name,
+                "success": success,
+                "files": sorted({change["path"] for change in pending}),
+                "ids": [change["id"] for change in pending],
+            }
+            self.flushes.append(flush)
+            return flush
+
+    def close(self):
+        return self.flush()
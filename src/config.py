@@ -1,8 +1,69 @@
 import os
+import shlex
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-TERRAFORM_MCP_SERVER_URL = "http://localhost:8081/mcp"
-CLOUD_RESOURCES_REPO_PATH = "/Users/shaik/POC_DEVOPS_AGENT/cloud-resources"
+# LLM client: one pooled connection per process. Transient failures (429, 5xx, timeouts) are
+# retried up to LLM_MAX_RETRIES times with jittered backoff, honouring Retry-After.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+TERRAFORM_MCP_SERVER_URL = os.getenv("TERRAFORM_MCP_SERVER_URL", "http://localhost:8081/mcp")
+CLOUD_RESOURCES_REPO_PATH = os.getenv("CLOUD_RESOURCES_REPO_PATH", "/Users/shaik/POC_DEVOPS_AGENT/cloud-resources")
+CLOUD_RESOURCES_REPO_URL = os.getenv("CLOUD_RESOURCES_REPO_URL", "https://github.com/mosk-anw/cloud-resources.git")
+CLOUD_RESOURCES_GITHUB_REPO = os.getenv("CLOUD_RESOURCES_GITHUB_REPO", "mosk-anw/cloud-resources")
+# Each feature branch is prepared in its own git worktree under this directory
+CLOUD_RESOURCES_WORKTREES_PATH = os.getenv("CLOUD_RESOURCES_WORKTREES_PATH", f"{CLOUD_RESOURCES_REPO_PATH}-worktrees")
+# Minimum seconds between "git fetch origin main" calls
+GIT_FETCH_INTERVAL = float(os.getenv("GIT_FETCH_INTERVAL", "60"))
+
+# MCP session settings. MCP_TRANSPORT is "stdio" (long-lived AZURE_MCP_COMMAND process)
+# or "http" (TERRAFORM_MCP_SERVER_URL).
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio")
+AZURE_MCP_COMMAND = shlex.split(os.getenv("AZURE_MCP_COMMAND", "npx -y @azure/mcp@latest server start"))
+AZURE_MCP_SCHEMA_TOOL = os.getenv("AZURE_MCP_SCHEMA_TOOL", "azmcp_bicepschema_get")
+AZURE_MCP_AZ_TOOL = os.getenv("AZURE_MCP_AZ_TOOL", "azmcp_extension_az")
+MCP_REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "60"))
+MCP_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+
+# Offline Bicep schema bundle built with "python -m src.schema_bundle"
+SCHEMA_BUNDLE_PATH = os.getenv("SCHEMA_BUNDLE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "azure_schemas.bundle"))
+SCHEMA_BUNDLE_TTL = float(os.getenv("SCHEMA_BUNDLE_TTL", str(7 * 24 * 3600)))
+
+# Azure location catalog cache
+LOCATION_CACHE_PATH = os.getenv("LOCATION_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "agent-ai-devops", "locations.json"))
+LOCATION_CACHE_TTL = float(os.getenv("LOCATION_CACHE_TTL", str(24 * 3600)))
+# After a failed first load, lookups skip the synchronous fetch for this many seconds
+LOCATION_RETRY_INTERVAL = float(os.getenv("LOCATION_RETRY_INTERVAL", "60"))
+
+# Persistent cache of LLM intent parses, keyed by the normalized request text
+INTENT_CACHE_PATH = os.getenv("INTENT_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "agent-ai-devops", "intent_cache.sqlite3"))
+INTENT_CACHE_MAX_ENTRIES = int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "1000"))
+INTENT_CACHE_TTL = float(os.getenv("INTENT_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Changeset mode: staged changes are flushed as one branch/PR after this many files or seconds
+CHANGESET_MAX_FILES = int(os.getenv("CHANGESET_MAX_FILES", "50"))
+CHANGESET_MAX_AGE = float(os.getenv("CHANGESET_MAX_AGE", "300"))
+
+# Existing .tf files longer than this are split into one file per resource before they are edited
+TERRAFORM_SPLIT_LINES = int(os.getenv("TERRAFORM_SPLIT_LINES", "500"))
+
+# Tracing: spans go to AGENT_TRACE_FILE (JSON lines) and aggregated metrics to AGENT_METRICS_FILE
+# (Prometheus text format). Both are off unless set.
+AGENT_TRACE_FILE = os.getenv("AGENT_TRACE_FILE")
+AGENT_METRICS_FILE = os.getenv("AGENT_METRICS_FILE")
+
+# External commands (git, gh): default timeout in seconds, how many run at once across the
+# process, and how much of each output stream is kept
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "300"))
+COMMAND_MAX_CONCURRENCY = int(os.getenv("COMMAND_MAX_CONCURRENCY", "8"))
+COMMAND_OUTPUT_LIMIT = int(os.getenv("COMMAND_OUTPUT_LIMIT", str(256 * 1024)))
+
+# Service mode: maximum provisioning requests handled at the same time
+AGENT_SERVICE_MAX_CONCURRENCY = int(os.getenv("AGENT_SERVICE_MAX_CONCURRENCY", "8"))
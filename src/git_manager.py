@@ -1,69 +1,206 @@
 import os
-import subprocess
-from src.config import CLOUD_RESOURCES_REPO_PATH
+import shutil
+import tempfile
+import threading
+import time
+from src.config import (
+    CLOUD_RESOURCES_GITHUB_REPO,
+    CLOUD_RESOURCES_REPO_PATH,
+    CLOUD_RESOURCES_REPO_URL,
+    CLOUD_RESOURCES_WORKTREES_PATH,
+    GIT_FETCH_INTERVAL,
+)
+from src.hcl_merge import merge_terraform
+from src.process_runner import get_process_runner
+from src.terraform_templates import bundled_module_files
 
-def run_command(command, cwd=None):
-    try:
-        result = subprocess.run(command, cwd=cwd, check=True, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print(result.stderr)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing command: {' '.join(e.cmd)}")
-        print(f"Stdout: {e.stdout}")
-        print(f"Stderr: {e.stderr}")
-        return False
-    except FileNotFoundError:
+def _print_line(stream_name, line):
+    print(line, end="", flush=True)
+
+def run_command(command, cwd=None, timeout=None, quiet=False):
+    # Runs on the shared process runner: output is echoed line by line as it arrives, the command
+    # is killed after `timeout` seconds (COMMAND_TIMEOUT by default) and git/gh never prompt.
+    # With quiet=True (background work) the output is kept and only shown if the command fails.
+    result = get_process_runner().run(command, cwd=cwd, timeout=timeout, on_line=None if quiet else _print_line)
+    if quiet and not result.ok:
+        print(result.stdout + result.stderr, end="", flush=True)
+    if result.not_found:
         print(f"Error: Command not found. Please ensure 'git' and 'gh' are installed and in your PATH.")
         return False
+    if result.timed_out:
+        print(f"Error: command timed out after {result.duration:.0f}s: {' '.join(command)}")
+        return False
+    if result.returncode != 0:
+        print(f"Error executing command: {' '.join(command)} (exit code {result.returncode})")
+        return False
+    return True
+
+class BranchInUseError(Exception):
+    pass
+
+class GitWorkspace:
+    # One blob-less clone of cloud-resources shared by all requests. Every feature branch is
+    # prepared in its own worktree off a recently fetched origin/main, so requests never touch
+    # each other's checkout and can run in parallel.
+    def __init__(self, repo_path, repo_url, worktrees_path, fetch_interval):
+        self.repo_path = repo_path
+        self.repo_url = repo_url
+        self.worktrees_path = worktrees_path
+        self.fetch_interval = fetch_interval
+        self._last_fetch = 0.0
+        # Branches with a worktree prepared by this process and not yet released
+        self._branches_in_use = set()
+        # Guards clone/fetch and worktree bookkeeping, which all write to the shared .git directory
+        self._lock = threading.Lock()
+
+    def _ensure_clone_locked(self, quiet=False):
+        if os.path.exists(os.path.join(self.repo_path, ".git")):
+            return True
+        if not quiet:
+            print(f"Cloning cloud-resources repository into {self.repo_path}...")
+        if not run_command(["git", "clone", "--filter=blob:none", "--no-checkout", self.repo_url, self.repo_path], quiet=quiet):
+            return False
+        self._last_fetch = time.monotonic()
+        return True
+
+    def sync(self, force=False, quiet=False):
+        # quiet=True for background prefetching: nothing is printed unless a command fails
+        with self._lock:
+            if not self._ensure_clone_locked(quiet):
+                return False
+            if not force and time.monotonic() - self._last_fetch < self.fetch_interval:
+                return True
+            if not quiet:
+                print(f"Fetching latest changes into {self.repo_path}...")
+            if not run_command(["git", "fetch", "--prune", "origin", "main"], cwd=self.repo_path, quiet=quiet):
+                return False
+            self._last_fetch = time.monotonic()
+            return True
+
+    def _stale_worktrees_locked(self, feature_branch_name):
+        # Worktrees still registered for the branch; the branch is not in use here, so these are
+        # left over from an interrupted run
+        result = get_process_runner().run(["git", "worktree", "list", "--porcelain"], cwd=self.repo_path)
+        if not result.ok:
+            return []
+        stale = []
+        worktree_path = None
+        for line in result.stdout.splitlines():
+            if line.startswith("worktree "):
+                worktree_path = line[len("worktree "):]
+            elif line == f"branch refs/heads/{feature_branch_name}" and worktree_path != self.repo_path:
+                stale.append(worktree_path)
+        return stale
+
+    def prepare_branch(self, feature_branch_name):
+        # Raises BranchInUseError if another request in this process is still using the branch
+        with self._lock:
+            if feature_branch_name in self._branches_in_use:
+                raise BranchInUseError(f"Branch {feature_branch_name} is already in use by another request")
+            self._branches_in_use.add(feature_branch_name)
+        worktree_path = None
+        try:
+            if not self.sync():
+                return None
+            with self._lock:
+                run_command(["git", "worktree", "prune"], cwd=self.repo_path)
+                for stale_path in self._stale_worktrees_locked(feature_branch_name):
+                    run_command(["git", "worktree", "remove", "--force", stale_path], cwd=self.repo_path)
+                os.makedirs(self.worktrees_path, exist_ok=True)
+                # A fresh directory per call, so nothing else can be checked out at this path
+                worktree_path = tempfile.mkdtemp(prefix=f"{feature_branch_name.replace('/', '-')}-", dir=self.worktrees_path)
+                print(f"Creating worktree for branch: {feature_branch_name}")
+                if not run_command(["git", "worktree", "add", "-B", feature_branch_name, worktree_path, "origin/main"], cwd=self.repo_path):
+                    shutil.rmtree(worktree_path, ignore_errors=True)
+                    worktree_path = None
+                    return None
+            return worktree_path
+        finally:
+            if worktree_path is None:
+                with self._lock:
+                    self._branches_in_use.discard(feature_branch_name)
+
+    def release(self, worktree_path, feature_branch_name):
+        with self._lock:
+            run_command(["git", "worktree", "remove", "--force", worktree_path], cwd=self.repo_path)
+            run_command(["git", "branch", "-D", feature_branch_name], cwd=self.repo_path)
+            self._branches_in_use.discard(feature_branch_name)
+
+_workspace = None
+_workspace_lock = threading.Lock()
+
+def get_workspace():
+    global _workspace
+    with _workspace_lock:
+        if _workspace is None:
+            _workspace = GitWorkspace(CLOUD_RESOURCES_REPO_PATH, CLOUD_RESOURCES_REPO_URL, CLOUD_RESOURCES_WORKTREES_PATH, GIT_FETCH_INTERVAL)
+        return _workspace
+
+def publish_branch(feature_branch_name, commits, pr_title, pr_body):
+    # commits is a list of (commit message, [(target file path, content), ...]); all of them land on
+    # one branch that is pushed once and gets a single Pull Request. Several contents for the same
+    # .tf path are merged one after another, each against what the previous one wrote.
+    workspace = get_workspace()
+    worktree_path = workspace.prepare_branch(feature_branch_name)
+    if not worktree_path:
+        return False
+
+    try:
+        for commit_message, files in commits:
+            written = []
+            for target_file_path, file_content in files:
+                if target_file_path.endswith(".tf"):
+                    # Merge into the existing Terraform instead of overwriting it
+                    try:
+                        changed_files = merge_terraform(os.path.join(worktree_path, os.path.dirname(target_file_path)), file_content, os.path.basename(target_file_path))
+                    except ValueError as e:
+                        print(f"Error merging Terraform into {target_file_path}: {e}")
+                        return False
+                    # Bundled modules the code calls are vendored next to it; they are not merged
+                    changed_files.update(bundled_module_files(file_content))
+                    changed_files = {os.path.join(os.path.dirname(target_file_path), path): text for path, text in changed_files.items()}
+                else:
+                    changed_files = {target_file_path: file_content}
+
+                for changed_path, changed_content in changed_files.items():
+                    # Ensure the target directory exists
+                    full_target_path = os.path.join(worktree_path, changed_path)
+                    os.makedirs(os.path.dirname(full_target_path), exist_ok=True)
+
+                    # Write the content to the file
+                    print(f"Writing content to {full_target_path}")
+                    with open(full_target_path, "w") as f:
+                        f.write(changed_content)
+                    if changed_path not in written:
+                        written.append(changed_path)
+
+            if not written:
+                print("No changes to commit for this group.")
+                continue
+
+            # Stage only the generated files and commit them
+            print("Adding and committing changes...")
+            if not run_command(["git", "add", "--", *written], cwd=worktree_path):
+                return False
+            if not run_command(["git", "commit", "-m", commit_message], cwd=worktree_path):
+                return False
+
+        # Push the branch
+        print(f"Pushing branch: {feature_branch_name}")
+        if not run_command(["git", "push", "-u", "origin", feature_branch_name], cwd=worktree_path):
+            return False
+
+        # Create a Pull Request using gh CLI
+        print(f"Creating Pull Request...")
+        if not run_command(["gh", "pr", "create", "--base", "main", "--head", feature_branch_name, "--title", pr_title, "--body", pr_body, "--repo", CLOUD_RESOURCES_GITHUB_REPO]):
+            return False
+
+        print("Git operations completed. A Pull Request has been created.")
+        return True
+    finally:
+        workspace.release(worktree_path, feature_branch_name)
 
 def handle_git_operations(feature_branch_name, file_content, target_file_path):
-    # Ensure the cloud-resources directory exists and is a git repo
-    if not os.path.exists(os.path.join(CLOUD_RESOURCES_REPO_PATH, ".git")):
-        print(f"Cloning cloud-resources repository into {CLOUD_RESOURCES_REPO_PATH}...")
-        if not run_command(["git", "clone", "https://github.com/mosk-anw/cloud-resources.git", CLOUD_RESOURCES_REPO_PATH]):
-            return
-    else:
-        print(f"cloud-resources repository already exists at {CLOUD_RESOURCES_REPO_PATH}. Fetching latest changes...")
-        if not run_command(["git", "fetch", "origin"], cwd=CLOUD_RESOURCES_REPO_PATH):
-            return
-        if not run_command(["git", "checkout", "main"], cwd=CLOUD_RESOURCES_REPO_PATH):
-            return
-        if not run_command(["git", "pull", "origin", "main"], cwd=CLOUD_RESOURCES_REPO_PATH):
-            return
-
-    # Create and switch to a new branch
-    print(f"Creating and switching to branch: {feature_branch_name}")
-    if not run_command(["git", "checkout", "-b", feature_branch_name], cwd=CLOUD_RESOURCES_REPO_PATH):
-        return
-
-    # Ensure the target directory exists
-    full_target_path = os.path.join(CLOUD_RESOURCES_REPO_PATH, target_file_path)
-    os.makedirs(os.path.dirname(full_target_path), exist_ok=True)
-
-    # Write the content to the file
-    print(f"Writing content to {full_target_path}")
-    with open(full_target_path, "w") as f:
-        f.write(file_content)
-
-    # Add and commit the changes
-    print("Adding and committing changes...")
-    if not run_command(["git", "add", "."], cwd=CLOUD_RESOURCES_REPO_PATH):
-        return
-    if not run_command(["git", "commit", "-m", f"Feat: {feature_branch_name}"], cwd=CLOUD_RESOURCES_REPO_PATH):
-        return
-
-    # Push the branch
-    print(f"Pushing branch: {feature_branch_name}")
-    if not run_command(["git", "push", "-u", "origin", feature_branch_name], cwd=CLOUD_RESOURCES_REPO_PATH):
-        return
-
-    # Create a Pull Request using gh CLI
     pr_title = f"Feat: {feature_branch_name}"
     pr_body = f"This PR adds {target_file_path} as requested by the AI agent."
-    print(f"Creating Pull Request...")
-    if not run_command(["gh", "pr", "create", "--base", "main", "--head", feature_branch_name, "--title", pr_title, "--body", pr_body, "--repo", "mosk-anw/cloud-resources"]):
-        return
-
-    print("Git operations completed. A Pull Request has been created.")
\ No newline at end of file
+    return publish_branch(feature_branch_name, [(pr_title, [(target_file_path, file_content)])], pr_title, pr_body)
@@ -1,26 +1,540 @@
 # src/github_actions_generator.py
+import copy
+import json
+import re
 
-def generate_github_action_workflow(action_name, trigger, workflow_description):
-    workflow_name = action_name.replace('-', ' ').title()
-    
-    workflow_yaml = f"""
-name: {workflow_name}
-
-on: [{trigger}]
-
-jobs:
-  build:
-    runs-on: ubuntu-latest
-    steps:
-    - name: Checkout repository
-      uses: actions/checkout@v3
-
-    - name: Echo description
-      run: echo "{workflow_description}"
-
-    # Add more steps here based on workflow_description
-    # This is a placeholder for actual build/deploy steps
-    - name: Placeholder Step
-      run: echo "This is a placeholder step for your workflow."
-"""
+# Workflows are built as plain dicts from a structured spec, checked against the structural rules
+# of the GitHub workflow schema, then written out as YAML.
+#
+# Spec keys (all optional): language, test_command, lint_command, deploy_target, shards, paths,
+# branches, working_directory, terraform, terraform_directory, artifact_path, app_name, environment
+WORKFLOW_SPEC_KEYS = (
+    "language", "test_command", "lint_command", "deploy_target", "shards", "paths", "branches",
+    "working_directory", "terraform", "terraform_directory", "artifact_path", "app_name", "environment",
+)
+
+TOOLCHAINS = {
+    "python": {
+        "setup": {"uses": "actions/setup-python@v5", "with": {"python-version": "3.12", "cache": "pip"}},
+        "install": "python -m pip install -r requirements.txt",
+        "test": "pytest",
+        "build": None,
+        "artifact_path": ".",
+        "paths": ["**/*.py", "requirements*.txt", "pyproject.toml"],
+    },
+    "node": {
+        "setup": {"uses": "actions/setup-node@v4", "with": {"node-version": "20", "cache": "npm"}},
+        "install": "npm ci",
+        "test": "npm test",
+        "build": "npm run build --if-present",
+        "artifact_path": "dist",
+        "paths": ["**/*.js", "**/*.ts", "**/*.tsx", "package.json", "package-lock.json"],
+    },
+    "go": {
+        "setup": {"uses": "actions/setup-go@v5", "with": {"go-version-file": "go.mod", "cache": True}},
+        "install": "go mod download",
+        "test": "go test ./...",
+        "build": "go build -o bin/ ./...",
+        "artifact_path": "bin",
+        "paths": ["**/*.go", "go.mod", "go.sum"],
+    },
+    "java": {
+        "setup": {"uses": "actions/setup-java@v4", "with": {"distribution": "temurin", "java-version": "21", "cache": "maven"}},
+        "install": None,
+        "test": "mvn -B test",
+        "build": "mvn -B -DskipTests package",
+        "artifact_path": "target/*.jar",
+        "paths": ["**/*.java", "pom.xml"],
+    },
+}
+
+DEPLOY_TARGETS = ("none", "azure-webapp", "container", "terraform")
+
+# Words in a free-text description that pick a toolchain or deploy target
+_LANGUAGE_WORDS = {
+    "python": ("python", "pytest", "django", "flask", "fastapi"),
+    "node": ("node", "nodejs", "node.js", "npm", "javascript", "typescript", "react", "jest"),
+    "go": ("golang", "go test", "go build"),
+    "java": ("java", "maven", "spring"),
+}
+_DEPLOY_WORDS = {
+    "terraform": ("terraform", "infrastructure", "infra", "cloud-resources"),
+    "azure-webapp": ("app service", "webapp", "web app"),
+    "container": ("docker", "container", "image"),
+}
+
+TERRAFORM_PATHS = ["**/*.tf", "**/.terraform.lock.hcl"]
+TERRAFORM_PLUGIN_CACHE = "${{ github.workspace }}/.terraform.d/plugin-cache"
+AZURE_OIDC_ENV = {
+    "ARM_CLIENT_ID": "${{ secrets.AZURE_CLIENT_ID }}",
+    "ARM_TENANT_ID": "${{ secrets.AZURE_TENANT_ID }}",
+    "ARM_SUBSCRIPTION_ID": "${{ secrets.AZURE_SUBSCRIPTION_ID }}",
+    "ARM_USE_OIDC": "true",
+}
+ON_MAIN_PUSH = "github.ref == 'refs/heads/main' && github.event_name == 'push'"
+
+
+def infer_workflow_spec(workflow_description):
+    # Best-effort spec from a sentence like "run pytest in 4 shards and deploy to app service"
+    text = (workflow_description or "").lower()
+    words = set(re.findall(r"[a-z0-9.+#-]+", text))
+    spec = {}
+    for language, keywords in _LANGUAGE_WORDS.items():
+        if any((keyword in text) if " " in keyword else (keyword in words) for keyword in keywords):
+            spec["language"] = language
+            break
+    for target, keywords in _DEPLOY_WORDS.items():
+        if any((keyword in text) if " " in keyword else (keyword in words) for keyword in keywords):
+            spec["deploy_target"] = target
+            break
+    shards = re.search(r"(\d+)\s+(?:shards|parallel|runners|groups)", text)
+    if shards:
+        spec["shards"] = int(shards.group(1))
+    return spec
+
+
+def _shard_test_command(language, test_command, shards):
+    # Native sharding for the common runners; None when the command cannot be split
+    shard = "${{ matrix.shard }}"
+    if "SHARD_INDEX" in test_command:
+        return test_command
+    if re.match(r"(?:python -m )?pytest\b", test_command):
+        return f"{test_command} --splits {shards} --group {shard}"
+    if language == "node" and re.match(r"(?:npx jest|jest)\b", test_command):
+        return f"{test_command} --shard={shard}/{shards}"
+    if language == "node" and re.match(r"(?:npm|yarn) test\b", test_command):
+        return f"{test_command} -- --shard={shard}/{shards}"
+    if language == "go" and test_command.startswith("go test") and "./..." in test_command:
+        return test_command.replace("./...", f"$(go list ./... | awk 'NR % {shards} == {shard} - 1')")
+    return None
+
+
+def _toolchain_steps(toolchain, extra_install=None):
+    steps = [{"name": "Checkout repository", "uses": "actions/checkout@v4"}]
+    steps.append({"name": "Set up toolchain (with dependency cache)", **copy.deepcopy(toolchain["setup"])})
+    install = toolchain["install"]
+    if extra_install:
+        install = f"{install} && {extra_install}" if install else extra_install
+    if install:
+        steps.append({"name": "Install dependencies", "run": install})
+    return steps
+
+
+def _terraform_jobs(directory, environment):
+    cache_steps = [
+        {"name": "Checkout repository", "uses": "actions/checkout@v4"},
+        {"name": "Create provider plugin cache directory", "run": f'mkdir -p "{TERRAFORM_PLUGIN_CACHE}"'},
+        {
+            "name": "Cache Terraform providers",
+            "uses": "actions/cache@v4",
+            "with": {
+                "path": TERRAFORM_PLUGIN_CACHE,
+                "key": "terraform-providers-${{ runner.os }}-${{ hashFiles('**/.terraform.lock.hcl') }}",
+                "restore-keys": "terraform-providers-${{ runner.os }}-",
+            },
+        },
+        {"name": "Set up Terraform", "uses": "hashicorp/setup-terraform@v3", "with": {"terraform_wrapper": False}},
+        {"name": "Terraform init", "run": "terraform init -input=false"},
+    ]
+    env = {"TF_IN_AUTOMATION": "true", "TF_PLUGIN_CACHE_DIR": TERRAFORM_PLUGIN_CACHE, **AZURE_OIDC_ENV}
+    defaults = {"run": {"working-directory": directory}}
+    plan = {
+        "runs-on": "ubuntu-latest",
+        "timeout-minutes": 30,
+        "env": env,
+        "defaults": defaults,
+        "steps": cache_steps + [
+            {"name": "Terraform fmt", "run": "terraform fmt -check -recursive"},
+            {"name": "Terraform validate", "run": "terraform validate -no-color"},
+            {"name": "Terraform plan", "run": "terraform plan -input=false -no-color -out=tfplan"},
+            {"name": "Upload plan", "uses": "actions/upload-artifact@v4", "with": {"name": "tfplan", "path": f"{directory.rstrip('/')}/tfplan", "retention-days": 5}},
+        ],
+    }
+    apply = {
+        "needs": ["terraform-plan"],
+        "if": ON_MAIN_PUSH,
+        "runs-on": "ubuntu-latest",
+        "timeout-minutes": 60,
+        "environment": environment,
+        # Never cancel an apply half way; queue the next one instead
+        "concurrency": {"group": "terraform-apply-${{ github.repository }}", "cancel-in-progress": False},
+        "env": env,
+        "defaults": defaults,
+        "steps": cache_steps + [
+            {"name": "Download plan", "uses": "actions/download-artifact@v4", "with": {"name": "tfplan", "path": directory}},
+            {"name": "Terraform apply", "run": "terraform apply -input=false -no-color tfplan"},
+        ],
+    }
+    return {"terraform-plan": plan, "terraform-apply": apply}
+
+
+_BRANCH_MARKERS = ("to", "into", "against", "branch", "branches")
+_COMMON_BRANCHES = ("main", "master", "develop", "trunk")
+_TRIGGER_FILLERS = ("the", "a", "an", "any", "every", "each", "new")
+
+
+def _trigger_events(trigger):
+    # Free-text answers such as "pull request", "pushes and pull requests" or "push to main".
+    # Returns (events, branches): known event names, and branch names after "to"/"into"/... or
+    # common ones like main. Every other word is ignored.
+    text = (trigger or "push").lower()
+    text = re.sub(r"\bpull[\s_-]*requests?\b", "pull_request", text)
+    text = re.sub(r"\bworkflow[\s_-]*dispatch\b|\bmanual(?:ly)?\b", "workflow_dispatch", text)
+    text = re.sub(r"\b(push|release)(?:es|s)\b", r"\1", text)
+    events = []
+    branches = []
+    expect_branch = False
+    previous_branch = False
+    for word in re.findall(r"[\w./*-]+", text):
+        is_branch = False
+        if word in _EVENTS:
+            events.append(word)
+            expect_branch = False
+        elif word in _BRANCH_MARKERS:
+            expect_branch = True
+        elif word in ("and", "or"):
+            expect_branch = previous_branch
+        elif word in _TRIGGER_FILLERS:
+            continue
+        elif expect_branch or word in _COMMON_BRANCHES:
+            branches.append(word)
+            is_branch = True
+            expect_branch = False
+        previous_branch = is_branch
+    if not events:
+        raise ValueError(f"No workflow event in trigger '{trigger}' (expected one of: {', '.join(sorted(_EVENTS))})")
+    return list(dict.fromkeys(events)), list(dict.fromkeys(branches))
+
+
+def build_workflow(action_name, trigger, workflow_description, spec=None):
+    spec = {**infer_workflow_spec(workflow_description), **(spec or {})}
+    language = spec.get("language")
+    if language is not None and language not in TOOLCHAINS:
+        raise ValueError(f"Unsupported language '{language}' (expected one of: {', '.join(TOOLCHAINS)})")
+    deploy_target = spec.get("deploy_target") or "none"
+    if deploy_target not in DEPLOY_TARGETS:
+        raise ValueError(f"Unsupported deploy target '{deploy_target}' (expected one of: {', '.join(DEPLOY_TARGETS)})")
+    toolchain = TOOLCHAINS.get(language)
+    # Terraform jobs (with an apply to production) only when asked for, explicitly or by a
+    # Terraform word in the description
+    terraform = bool(spec.get("terraform")) or deploy_target == "terraform"
+    if not toolchain and not terraform and not (spec.get("test_command") or spec.get("lint_command")):
+        raise ValueError(
+            "Could not tell what the workflow should run: name a language "
+            f"({', '.join(TOOLCHAINS)}), a test or lint command, or Terraform"
+        )
+    environment = spec.get("environment", "production")
+    events, trigger_branches = _trigger_events(trigger)
+    branches = spec.get("branches") or trigger_branches or ["main"]
+    slug = action_name.lower().replace(" ", "-")
+
+    # Triggers, with path filters so unrelated changes do not start the workflow at all
+    paths = list(spec.get("paths") or [])
+    if not paths:
+        if toolchain:
+            paths.extend(toolchain["paths"])
+        if terraform:
+            paths.extend(TERRAFORM_PATHS)
+    # Plain command jobs have no file types to filter on, so they run on every change
+    if paths:
+        paths.append(f".github/workflows/{slug}.yml")
+    on = {}
+    for event in events:
+        if event in ("push", "pull_request"):
+            on[event] = {"branches": branches, **({"paths": paths} if paths else {})}
+        elif event == "schedule":
+            on[event] = [{"cron": spec.get("cron", "0 3 * * *")}]
+        else:
+            on[event] = {}
+    if "workflow_dispatch" not in on:
+        on["workflow_dispatch"] = {}
+
+    needs_oidc = terraform or deploy_target == "azure-webapp"
+    workflow = {
+        "name": action_name.replace("-", " ").title(),
+        "on": on,
+        # A newer push to the same PR supersedes the running checks; pushes to main always finish
+        "concurrency": {
+            "group": "${{ github.workflow }}-${{ github.event.pull_request.number || github.ref }}",
+            "cancel-in-progress": "${{ github.event_name == 'pull_request' }}",
+        },
+        "permissions": {"contents": "read", **({"id-token": "write"} if needs_oidc else {})},
+        "jobs": {},
+    }
+    jobs = workflow["jobs"]
+    working_directory = spec.get("working_directory")
+    defaults = {"defaults": {"run": {"working-directory": working_directory}}} if working_directory else {}
+
+    if toolchain:
+        if spec.get("lint_command"):
+            jobs["lint"] = {
+                "runs-on": "ubuntu-latest",
+                "timeout-minutes": 10,
+                **defaults,
+                "steps": _toolchain_steps(toolchain) + [{"name": "Lint", "run": spec["lint_command"]}],
+            }
+
+        test_command = spec.get("test_command") or toolchain["test"]
+        shards = max(1, int(spec.get("shards", 1)))
+        sharded_command = _shard_test_command(language, test_command, shards) if shards > 1 else None
+        if sharded_command is None:
+            shards = 1
+        test_job = {"runs-on": "ubuntu-latest", "timeout-minutes": 30, **defaults}
+        if shards > 1:
+            test_job = {"name": f"test (shard ${{{{ matrix.shard }}}}/{shards})", **test_job}
+            test_job["strategy"] = {"fail-fast": False, "matrix": {"shard": list(range(1, shards + 1))}}
+            test_job["env"] = {"SHARD_INDEX": "${{ matrix.shard }}", "SHARD_TOTAL": str(shards)}
+        extra_install = "python -m pip install pytest-split" if shards > 1 and "--splits" in sharded_command else None
+        test_job["steps"] = _toolchain_steps(toolchain, extra_install) + [{"name": "Run tests", "run": sharded_command or test_command}]
+        jobs["test"] = test_job
+
+        # Build runs alongside the tests; only deployment waits for both
+        artifact_path = spec.get("artifact_path") or toolchain["artifact_path"]
+        if deploy_target == "container":
+            jobs["build"] = {
+                "runs-on": "ubuntu-latest",
+                "timeout-minutes": 30,
+                "steps": [
+                    {"name": "Checkout repository", "uses": "actions/checkout@v4"},
+                    {"name": "Set up Docker Buildx", "uses": "docker/setup-buildx-action@v3"},
+                    {
+                        "name": "Log in to registry",
+                        "if": ON_MAIN_PUSH,
+                        "uses": "docker/login-action@v3",
+                        "with": {"registry": "${{ secrets.REGISTRY_LOGIN_SERVER }}", "username": "${{ secrets.REGISTRY_USERNAME }}", "password": "${{ secrets.REGISTRY_PASSWORD }}"},
+                    },
+                    {
+                        "name": "Build and push image (with layer cache)",
+                        "uses": "docker/build-push-action@v6",
+                        "with": {
+                            "context": working_directory or ".",
+                            "push": f"${{{{ {ON_MAIN_PUSH} }}}}",
+                            "tags": f"${{{{ secrets.REGISTRY_LOGIN_SERVER }}}}/{slug}:${{{{ github.sha }}}}",
+                            "cache-from": "type=gha",
+                            "cache-to": "type=gha,mode=max",
+                        },
+                    },
+                ],
+            }
+        elif toolchain["build"] or deploy_target == "azure-webapp":
+            build_steps = _toolchain_steps(toolchain)
+            if toolchain["build"]:
+                build_steps.append({"name": "Build", "run": toolchain["build"]})
+            if deploy_target == "azure-webapp":
+                upload_path = f"{working_directory.rstrip('/')}/{artifact_path}" if working_directory else artifact_path
+                build_steps.append({"name": "Upload build output", "uses": "actions/upload-artifact@v4", "with": {"name": "app", "path": upload_path, "retention-days": 5}})
+            jobs["build"] = {"runs-on": "ubuntu-latest", "timeout-minutes": 20, **defaults, "steps": build_steps}
+
+        if deploy_target == "azure-webapp":
+            jobs["deploy"] = {
+                "needs": [name for name in ("lint", "test", "build") if name in jobs],
+                "if": ON_MAIN_PUSH,
+                "runs-on": "ubuntu-latest",
+                "timeout-minutes": 20,
+                "environment": environment,
+                "concurrency": {"group": f"deploy-{slug}", "cancel-in-progress": False},
+                "steps": [
+                    {"name": "Download build output", "uses": "actions/download-artifact@v4", "with": {"name": "app", "path": "app"}},
+                    {
+                        "name": "Azure login",
+                        "uses": "azure/login@v2",
+                        "with": {"client-id": "${{ secrets.AZURE_CLIENT_ID }}", "tenant-id": "${{ secrets.AZURE_TENANT_ID }}", "subscription-id": "${{ secrets.AZURE_SUBSCRIPTION_ID }}"},
+                    },
+                    {"name": "Deploy to Azure Web App", "uses": "azure/webapps-deploy@v3", "with": {"app-name": spec.get("app_name", slug), "package": "app"}},
+                ],
+            }
+
+    else:
+        # No known toolchain: run the given commands as they are
+        for job_name, command_key in (("lint", "lint_command"), ("test", "test_command")):
+            if spec.get(command_key):
+                jobs[job_name] = {
+                    "runs-on": "ubuntu-latest",
+                    "timeout-minutes": 30,
+                    **defaults,
+                    "steps": [{"name": "Checkout repository", "uses": "actions/checkout@v4"}, {"name": job_name.title(), "run": spec[command_key]}],
+                }
+
+    if terraform:
+        jobs.update(_terraform_jobs(spec.get("terraform_directory", "."), environment))
+    return workflow
+
+
+_JOB_ID_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*$")
+_TOP_LEVEL_KEYS = {"name", "run-name", "on", "permissions", "env", "defaults", "concurrency", "jobs"}
+_JOB_KEYS = {
+    "name", "needs", "permissions", "runs-on", "environment", "concurrency", "outputs", "env", "defaults",
+    "if", "steps", "timeout-minutes", "strategy", "continue-on-error", "container", "services", "uses", "with", "secrets",
+}
+_STEP_KEYS = {"id", "if", "name", "uses", "run", "working-directory", "shell", "with", "env", "continue-on-error", "timeout-minutes"}
+_EVENTS = {
+    "push", "pull_request", "pull_request_target", "workflow_dispatch", "schedule", "release", "workflow_call",
+    "workflow_run", "merge_group", "repository_dispatch",
+}
+_PERMISSION_LEVELS = {"read", "write", "none"}
+
+
+def validate_workflow(workflow):
+    # Structural rules from the GitHub workflow JSON schema that matter for generated files.
+    # Returns a list of problems; an empty list means the workflow is valid.
+    errors = []
+    for key in workflow:
+        if key not in _TOP_LEVEL_KEYS:
+            errors.append(f"unknown top-level key '{key}'")
+    on = workflow.get("on")
+    if not on:
+        errors.append("'on' is required")
+    elif isinstance(on, dict):
+        for event, config in on.items():
+            if event not in _EVENTS:
+                errors.append(f"unknown event '{event}'")
+            if event == "schedule" and not (isinstance(config, list) and all(isinstance(item, dict) and "cron" in item for item in config)):
+                errors.append("'schedule' must be a list of {cron} entries")
+            if isinstance(config, dict) and "paths" in config and "paths-ignore" in config:
+                errors.append(f"'{event}' cannot have both paths and paths-ignore")
+    for scope, value in workflow.get("permissions", {}).items():
+        if value not in _PERMISSION_LEVELS:
+            errors.append(f"permission '{scope}' must be read, write or none")
+    if "concurrency" in workflow and "group" not in workflow["concurrency"]:
+        errors.append("concurrency needs a group")
+
+    jobs = workflow.get("jobs")
+    if not isinstance(jobs, dict) or not jobs:
+        return errors + ["'jobs' must be a non-empty mapping"]
+    for job_id, job in jobs.items():
+        where = f"job '{job_id}'"
+        if not _JOB_ID_RE.match(job_id):
+            errors.append(f"{where}: invalid job id")
+        for key in job:
+            if key not in _JOB_KEYS:
+                errors.append(f"{where}: unknown key '{key}'")
+        if "uses" in job:
+            continue  # Reusable workflow call
+        if "runs-on" not in job:
+            errors.append(f"{where}: 'runs-on' is required")
+        needs = job.get("needs", [])
+        for dependency in [needs] if isinstance(needs, str) else needs:
+            if dependency not in jobs:
+                errors.append(f"{where}: needs unknown job '{dependency}'")
+        matrix = job.get("strategy", {}).get("matrix")
+        if matrix is not None and (not isinstance(matrix, dict) or not matrix):
+            errors.append(f"{where}: strategy.matrix must be a non-empty mapping")
+        steps = job.get("steps")
+        if not isinstance(steps, list) or not steps:
+            errors.append(f"{where}: 'steps' must be a non-empty list")
+            continue
+        for index, step in enumerate(steps):
+            for key in step:
+                if key not in _STEP_KEYS:
+                    errors.append(f"{where} step {index + 1}: unknown key '{key}'")
+            if ("uses" in step) == ("run" in step):
+                errors.append(f"{where} step {index + 1}: needs exactly one of 'uses' or 'run'")
+            if "with" in step and "uses" not in step:
+                errors.append(f"{where} step {index + 1}: 'with' only applies to 'uses' steps")
+
+    # needs must not form a cycle
+    visiting, done = set(), set()
+
+    def visit(job_id):
+        if job_id in done or job_id not in jobs:
+            return
+        if job_id in visiting:
+            errors.append(f"job '{job_id}': circular needs")
+            return
+        visiting.add(job_id)
+        needs = jobs[job_id].get("needs", [])
+        for dependency in [needs] if isinstance(needs, str) else needs:
+            visit(dependency)
+        visiting.discard(job_id)
+        done.add(job_id)
+
+    for job_id in jobs:
+        visit(job_id)
+    return errors
+
+
+_PLAIN_RE = re.compile(r"^[A-Za-z_./][A-Za-z0-9_ ./@+=-]*$")
+_YAML_WORDS = {"true", "false", "yes", "no", "on", "off", "null", "y", "n", "~"}
+
+
+def _looks_numeric(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _yaml_scalar(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    text = str(value)
+    if _PLAIN_RE.match(text) and not text.endswith(" ") and text.lower() not in _YAML_WORDS and not _looks_numeric(text):
+        return text
+    return json.dumps(text)
+
+
+def _yaml_key(key):
+    # "on" stays bare: GitHub reads it as the event key
+    return key if re.match(r"^[A-Za-z0-9_-]+$", key) else json.dumps(key)
+
+
+def _yaml_lines(value, indent):
+    pad = "  " * indent
+    lines = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and item:
+                lines.append(f"{pad}{_yaml_key(key)}:")
+                lines.extend(_yaml_lines(item, indent + 1))
+            elif isinstance(item, str) and "\n" in item:
+                lines.append(f"{pad}{_yaml_key(key)}: |")
+                lines.extend(f"{pad}  {line}" if line else "" for line in item.rstrip("\n").split("\n"))
+            else:
+                lines.append(f"{pad}{_yaml_key(key)}: {_yaml_inline(item)}")
+    else:
+        for item in value:
+            if isinstance(item, (dict, list)) and item:
+                nested = _yaml_lines(item, indent + 1)
+                lines.append(f"{pad}- {nested[0].lstrip()}")
+                lines.extend(nested[1:])
+            else:
+                lines.append(f"{pad}- {_yaml_inline(item)}")
+    return lines
+
+
+def _yaml_inline(value):
+    if isinstance(value, dict):
+        return "{}"
+    if isinstance(value, list):
+        return "[]"
+    return _yaml_scalar(value)
+
+
+def workflow_to_yaml(workflow):
+    return "\n".join(_yaml_lines(workflow, 0)) + "\n"
+
+
+def _check_round_trip(workflow, text):
+    # With PyYAML installed, make sure the emitted text reads back as the same workflow
+    try:
+        import yaml
+    except ImportError:
+        return
+    loaded = yaml.safe_load(text)
+    if True in loaded:  # YAML 1.1 reads a bare "on" key as a boolean
+        loaded = {("on" if key is True else key): item for key, item in loaded.items()}
+    if loaded != workflow:
+        raise ValueError("Generated workflow YAML does not round-trip")
+
+
+def generate_github_action_workflow(action_name, trigger, workflow_description, spec=None):
+    workflow = build_workflow(action_name, trigger, workflow_description, spec)
+    errors = validate_workflow(workflow)
+    if errors:
+        raise ValueError("Invalid workflow: " + "; ".join(errors))
+    workflow_yaml = workflow_to_yaml(workflow)
+    _check_round_trip(workflow, workflow_yaml)
     return workflow_yaml
@@ -0,0 +1,385 @@
+import glob
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from src.config import TERRAFORM_SPLIT_LINES
+
+# Block kinds whose labels can be referenced as <type>.<label> (resource), data.<type>.<label> and
+# module.<label>. These are the ones that get relabelled when they are merged.
+RENAMEABLE_KINDS = ("resource", "data", "module")
+
+_HEADER_RE = re.compile(r'([A-Za-z_][\w-]*)((?:[ \t]+(?:"[^"\n]*"|[A-Za-z_][\w-]*))*)[ \t]*\{')
+_LABEL_RE = re.compile(r'"([^"\n]*)"|([A-Za-z_][\w-]*)')
+_HEREDOC_RE = re.compile(r"<<-?([A-Za-z_]\w*)[ \t]*\n")
+_REFERENCE_RE = re.compile(r"^((?:data\.)?[A-Za-z_][\w-]*\.[A-Za-z_][\w-]*)\.([A-Za-z_]\w*)$")
+
+
+class Block:
+    def __init__(self, kind, labels, start, end, text):
+        self.kind = kind
+        self.labels = labels
+        self.start = start
+        self.end = end
+        self.text = text
+
+    @property
+    def address(self):
+        return ".".join([self.kind, *self.labels])
+
+    @property
+    def type(self):
+        return self.labels[0] if self.kind in ("resource", "data") and len(self.labels) == 2 else None
+
+    @property
+    def label(self):
+        return self.labels[-1] if self.labels else None
+
+    def attribute(self, name):
+        # Raw expression of a top-level attribute, e.g. '"web"' or 'azurerm_resource_group.rg.name'
+        match = re.search(rf"^[ \t]*{re.escape(name)}[ \t]*=[ \t]*(.*?)[ \t]*$", _top_level_body(self.text), re.MULTILINE)
+        return match.group(1) if match else None
+
+    @property
+    def name_attribute(self):
+        value = self.attribute("name")
+        return value[1:-1] if value and len(value) >= 2 and value[0] == value[-1] == '"' else None
+
+
+def _resolve_attribute(block, name, lookup, depth=0):
+    # The value of an attribute, following references like azurerm_resource_group.rg.name to the
+    # block they point at (lookup maps an address to a Block). Unresolvable expressions stay as is.
+    value = block.attribute(name)
+    if value is None:
+        return None
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    match = _REFERENCE_RE.match(value)
+    if match and depth < 5:
+        address = match.group(1) if match.group(1).startswith("data.") else f"resource.{match.group(1)}"
+        target = lookup(address)
+        if target is not None:
+            resolved = _resolve_attribute(target, match.group(2), lookup, depth + 1)
+            if resolved is not None:
+                return resolved
+    return value
+
+
+def _identity(block, lookup):
+    # What makes two blocks the same Azure resource: kind, type, name and, for resources that live
+    # in a resource group, that group. None when the block has no literal name.
+    if not block.type or not block.name_attribute:
+        return None
+    return (block.kind, block.type, block.name_attribute, _resolve_attribute(block, "resource_group_name", lookup))
+
+
+def _skip_string(text, i):
+    # i points at the opening quote; returns the index after the closing quote
+    i += 1
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == '"':
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_comment_or_heredoc(text, i):
+    # Returns the index after a comment or heredoc starting at i, or None if there is none
+    if text.startswith("#", i) or text.startswith("//", i):
+        end = text.find("\n", i)
+        return len(text) if end == -1 else end
+    if text.startswith("/*", i):
+        end = text.find("*/", i + 2)
+        return len(text) if end == -1 else end + 2
+    if text.startswith("<<", i):
+        match = _HEREDOC_RE.match(text, i)
+        if match:
+            end = re.compile(rf"^[ \t]*{re.escape(match.group(1))}[ \t]*$", re.MULTILINE).search(text, match.end())
+            return len(text) if end is None else end.end()
+    return None
+
+
+def _matching_brace(text, i):
+    # i points at "{"; returns the index after the matching "}"
+    depth = 0
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            i = _skip_string(text, i)
+            continue
+        skipped = _skip_comment_or_heredoc(text, i)
+        if skipped is not None:
+            i = skipped
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ValueError("Unbalanced braces in Terraform code")
+
+
+def _top_level_body(block_text):
+    # The block text with nested blocks, strings' contents aside, cut out
+    kept = []
+    depth = 0
+    i = 0
+    while i < len(block_text):
+        char = block_text[i]
+        if char == '"':
+            end = _skip_string(block_text, i)
+            if depth == 1:
+                kept.append(block_text[i:end])
+            i = end
+            continue
+        skipped = _skip_comment_or_heredoc(block_text, i)
+        if skipped is not None:
+            i = skipped
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif depth == 1:
+            kept.append(char)
+        i += 1
+    return "".join(kept)
+
+
+def scan_blocks(text):
+    blocks = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char.isspace():
+            i += 1
+            continue
+        skipped = _skip_comment_or_heredoc(text, i)
+        if skipped is not None:
+            i = skipped
+            continue
+        match = _HEADER_RE.match(text, i)
+        if not match:
+            raise ValueError(f"Unexpected Terraform syntax at offset {i}: {text[i:i + 40]!r}")
+        labels = [quoted if quoted is not None else bare for quoted, bare in _LABEL_RE.findall(match.group(2))]
+        end = _matching_brace(text, match.end() - 1)
+        blocks.append(Block(match.group(1), labels, i, end, text[i:end]))
+        i = end
+    return blocks
+
+
+# Parsed files keyed by content hash, shared by every worktree of the same repository
+_scan_cache = OrderedDict()
+_scan_cache_lock = threading.Lock()
+SCAN_CACHE_SIZE = 2048
+
+
+def _scan_cached(text):
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    with _scan_cache_lock:
+        blocks = _scan_cache.get(key)
+        if blocks is not None:
+            _scan_cache.move_to_end(key)
+            return blocks
+    blocks = scan_blocks(text)
+    with _scan_cache_lock:
+        _scan_cache[key] = blocks
+        while len(_scan_cache) > SCAN_CACHE_SIZE:
+            _scan_cache.popitem(last=False)
+    return blocks
+
+
+class TerraformIndex:
+    # Addresses of every top-level block in the *.tf files of one directory
+    def __init__(self, root):
+        self.root = root
+        self.texts = {}
+        self.blocks = {}
+        self.by_address = {}
+        self.by_identity = {}
+        for path in sorted(glob.glob(os.path.join(root, "*.tf"))):
+            with open(path) as f:
+                self._add_file(os.path.relpath(path, root), f.read())
+        # Identities follow references across files, so they are computed once everything is loaded
+        for _, block in list(self.by_address.values()):
+            identity = _identity(block, self.block)
+            if identity:
+                self.by_identity[identity] = block.address
+
+    def block(self, address):
+        location = self.by_address.get(address)
+        return location[1] if location else None
+
+    def _add_file(self, relative_path, text):
+        self.texts[relative_path] = text
+        self.blocks[relative_path] = _scan_cached(text)
+        for block in self.blocks[relative_path]:
+            self.by_address[block.address] = (relative_path, block)
+
+    def split_file(self, relative_path):
+        # Moves every resource/data block of a large file into its own file; returns the new texts
+        blocks = self.blocks[relative_path]
+        text = self.texts[relative_path]
+        remaining = []
+        cursor = 0
+        new_files = {}
+        for block in blocks:
+            if block.kind not in ("resource", "data"):
+                continue
+            remaining.append(text[cursor:block.start])
+            cursor = block.end
+            new_files[_unique_file_name(self, f"{block.type}-{block.label}", new_files)] = block.text.strip() + "\n"
+        remaining.append(text[cursor:])
+        new_files[relative_path] = re.sub(r"\n{3,}", "\n\n", "".join(remaining)).strip() + "\n"
+
+        for path in new_files:
+            for block in self.blocks.get(path, []):
+                self.by_address.pop(block.address, None)
+        for path, new_text in new_files.items():
+            self._add_file(path, new_text)
+        return new_files
+
+
+def _unique_file_name(index, stem, pending=()):
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "-", stem).strip("-").lower() or "resource"
+    file_name = f"{stem}.tf"
+    suffix = 2
+    while file_name in index.texts or file_name in pending:
+        file_name = f"{stem}-{suffix}.tf"
+        suffix += 1
+    return file_name
+
+
+def label_from_name(name):
+    label = re.sub(r"[^A-Za-z0-9_]+", "_", name).strip("_").lower()
+    if not label or not (label[0].isalpha() or label[0] == "_"):
+        label = f"r_{label}"
+    return label
+
+
+def _rename_labels(code, blocks, new_labels):
+    # new_labels[i] is the label for blocks[i]. Headers are renamed per block, so two blocks that
+    # share a label in the generated code can get different ones. A reference binds to the nearest
+    # earlier block with that address (templates declare before they use), else the first later one.
+    if all(new_label == block.label for block, new_label in zip(blocks, new_labels)):
+        return code
+
+    def target(position, kind, block_type, label):
+        candidates = [j for j, block in enumerate(blocks) if (block.kind, block.type, block.label) == (kind, block_type, label)]
+        if not candidates:
+            return None
+        earlier = [j for j in candidates if j <= position]
+        return new_labels[earlier[-1] if earlier else candidates[0]]
+
+    def rename_block(position, block):
+        def reference(match):
+            data, first, second = match.group(1), match.group(2), match.group(3)
+            if first == "module":
+                new_label = target(position, "module", None, second)
+                return match.group(0) if new_label is None else f"module.{new_label}"
+            new_label = target(position, "data" if data else "resource", first, second)
+            return match.group(0) if new_label is None else f"{data or ''}{first}.{new_label}"
+
+        text = re.sub(r"(?<![\w.\"])(data\.)?([A-Za-z_][\w-]*)\.([A-Za-z_][\w-]*)\b", reference, block.text)
+        if new_labels[position] == block.label or block.kind not in RENAMEABLE_KINDS:
+            return text
+        header = f'{block.kind} "{block.type}" "{new_labels[position]}"' if block.type else f'{block.kind} "{new_labels[position]}"'
+        return re.sub(r'^[A-Za-z_][\w-]*(?:[ \t]+(?:"[^"\n]*"|[A-Za-z_][\w-]*))*', lambda _: header, text, count=1)
+
+    pieces = []
+    cursor = 0
+    for position, block in enumerate(blocks):
+        pieces.append(code[cursor:block.start])
+        pieces.append(rename_block(position, block))
+        cursor = block.end
+    pieces.append(code[cursor:])
+    return "".join(pieces)
+
+
+def merge_terraform(root, code, target_file_path, split_lines=TERRAFORM_SPLIT_LINES):
+    # Merges generated Terraform into the *.tf files under root. Blocks that describe an existing
+    # resource (same kind, type, "name" and resource group, or same module label) are updated in
+    # place, unless that would move it to another location: then the existing block is kept as it
+    # is and the new code refers to it. New resource and data blocks are labelled after their "name" attribute, so two requests
+    # branched off the same main never declare the same address, and go to target_file_path.
+    # Returns {relative path: new text} for every file that changed; nothing is written to disk.
+    index = TerraformIndex(root)
+    new_blocks = scan_blocks(code)
+
+    def new_lookup(position):
+        # References in generated code resolve to the nearest earlier block with that address,
+        # then to the existing files
+        def lookup(address):
+            for block in reversed(new_blocks[:position]):
+                if block.address == address:
+                    return block
+            return index.block(address)
+        return lookup
+
+    new_labels = []
+    kept = set()
+    taken = set(index.by_address)
+    for position, block in enumerate(new_blocks):
+        label = block.label
+        if block.kind in RENAMEABLE_KINDS:
+            if block.type:
+                identity = _identity(block, new_lookup(position))
+                existing = index.by_identity.get(identity) if identity else None
+                if existing:
+                    existing_block = index.block(existing)
+                    new_labels.append(existing_block.label)
+                    new_location = _resolve_attribute(block, "location", new_lookup(position))
+                    old_location = _resolve_attribute(existing_block, "location", index.block)
+                    if new_location and old_location and new_location != old_location:
+                        print(f"Warning: {existing} already exists in {old_location}; keeping it instead of moving it to {new_location}.")
+                        kept.add(position)
+                    continue
+                if block.name_attribute:
+                    label = label_from_name(block.name_attribute)
+            elif block.address in index.by_address:
+                new_labels.append(label)  # Same module label: update the module call in place
+                continue
+            base_label = label
+            suffix = 2
+            while ".".join([block.kind, *block.labels[:-1], label]) in taken:
+                label = f"{base_label}_{suffix}"
+                suffix += 1
+            taken.add(".".join([block.kind, *block.labels[:-1], label]))
+        new_labels.append(label)
+
+    changed = {}
+    replacements = {}
+    appended = []
+    for position, block in enumerate(scan_blocks(_rename_labels(code, new_blocks, new_labels))):
+        if position in kept:
+            continue
+        location = index.by_address.get(block.address) if block.labels else None
+        if location is None:
+            appended.append(block.text)
+            continue
+        relative_path = location[0]
+        if split_lines and index.texts[relative_path].count("\n") > split_lines and relative_path not in replacements:
+            changed.update(index.split_file(relative_path))
+            relative_path = index.by_address[block.address][0]
+        replacements.setdefault(relative_path, []).append((index.by_address[block.address][1], block.text))
+
+    for relative_path, file_replacements in replacements.items():
+        text = index.texts[relative_path]
+        for old_block, new_text in sorted(file_replacements, key=lambda item: item[0].start, reverse=True):
+            text = text[:old_block.start] + new_text + text[old_block.end:]
+        if text != index.texts[relative_path] or relative_path in changed:
+            changed[relative_path] = text
+
+    if appended:
+        existing_text = changed.get(target_file_path, index.texts.get(target_file_path, ""))
+        separator = "\n" if existing_text and not existing_text.endswith("\n\n") else ""
+        changed[target_file_path] = existing_text + separator + "\n\n".join(appended) + "\n"
+
+    return changed
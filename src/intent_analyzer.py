@@ -1,44 +1,97 @@
-import json
-import openai
-import sys
-from src.config import OPENAI_API_KEY
+import hashlib
+import threading
+from src.config import INTENT_CACHE_MAX_ENTRIES, INTENT_CACHE_PATH, INTENT_CACHE_TTL, LLM_MODEL
+from src.intent_grammar import parse_intent_locally
+from src.llm_client import LLMError, get_llm_client
+from src.response_cache import ResponseCache
+from src.terraform_templates import resolve_resource_type
+from src.tracing import span
 
-if not OPENAI_API_KEY:
-    print("Error: OPENAI_API_KEY not found in .env file or environment variables.")
-    sys.exit(1)
-openai.api_key = OPENAI_API_KEY
+_intent_cache = ResponseCache(INTENT_CACHE_PATH, max_entries=INTENT_CACHE_MAX_ENTRIES, ttl=INTENT_CACHE_TTL)
+_stats = {"local": 0, "cache": 0, "llm": 0}
+_stats_lock = threading.Lock()
 
-def parse_intent_with_llm(user_input):
+INTENT_SYSTEM_PROMPT = """You are a helpful assistant that parses user requests into structured JSON. Identify the intent and extract parameters.
+
+Analyze the user request to identify the intent and extract relevant parameters.
+The intent should be 'create_resource' or 'create_github_action'.
+
+For 'create_resource' intent, parameters should include 'resource_type' (string, e.g., 'resource group', 'virtual machine', 'storage account', 'aks cluster') and other relevant parameters for the resource.
+For many VMs at once use resource_type 'virtual machine fleet' with 'instances' set to a count, or to a list of {"name", "size", "os_image", "count"} objects when the VMs differ.
+
+For 'create_github_action' intent, parameters should include 'action_name' (string), 'trigger' (string, e.g., 'push', 'pull_request'), and 'workflow_description' (string, a brief description of what the action should do).
+When the request says so, also include 'language' ('python', 'node', 'go' or 'java'), 'test_command', 'deploy_target' ('azure-webapp', 'container' or 'terraform') and 'shards' (number of parallel test jobs).
+
+Respond in JSON format with "intent" as the first key. If a parameter is not found, omit it.
+
+Example for 'create_resource' (resource group):
+{"intent": "create_resource", "parameters": {"resource_type": "resource group", "name": "my-rg", "location": "eastus"}}
+
+Example for 'create_github_action':
+{"intent": "create_github_action", "parameters": {"action_name": "deploy-app", "trigger": "push", "workflow_description": "Build and deploy a Node.js application to Azure App Service."}}"""
+
+def _count(tier):
+    with _stats_lock:
+        _stats[tier] += 1
+
+def get_intent_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    stats["llm_calls_saved"] = stats["local"] + stats["cache"]
+    stats["hit_rate"] = stats["llm_calls_saved"] / total if total else 0.0
+    stats["llm_usage"] = get_llm_client().stats()
+    return stats
+
+# Cached answers are only valid for the model and instructions that produced them
+_CACHE_NAMESPACE = hashlib.sha256(f"{LLM_MODEL}\n{INTENT_SYSTEM_PROMPT}".encode("utf-8")).hexdigest()[:16]
+
+def _normalize_request(user_input):
+    return " ".join(user_input.split()).rstrip(".!?")
+
+def _cache_key(user_input):
+    return f"{_CACHE_NAMESPACE}:{_normalize_request(user_input)}"
+
+def parse_intent_with_llm(user_input, on_field=None):
+    # on_field(path, value) sees string fields of a streamed LLM answer as they arrive
+    with span("intent.parse", bytes_out=len(user_input)) as parse_span:
+        # Tier 1: local grammar for common phrasings, no network call
+        parsed_json = parse_intent_locally(user_input)
+        if parsed_json:
+            _count("local")
+            parse_span.set(tier="local", intent=parsed_json["intent"])
+            return parsed_json
+
+        # Tier 2: persistent cache of earlier LLM answers for the same request
+        cache_key = _cache_key(user_input)
+        parsed_json = _intent_cache.get(cache_key)
+        if parsed_json:
+            _count("cache")
+            parse_span.set(tier="cache", intent=parsed_json.get("intent"))
+            return parsed_json
+
+        # Tier 3: the LLM
+        _count("llm")
+        parsed_json = _parse_intent_with_openai(user_input, on_field)
+        if parsed_json.get("intent") in ("create_resource", "create_github_action"):
+            _intent_cache.put(cache_key, parsed_json)
+        parse_span.set(tier="llm", intent=parsed_json.get("intent"))
+        return parsed_json
+
+def _parse_intent_with_openai(user_input, on_field=None):
+    # The instructions are static so every call sends an identical prefix; only the request varies
+    messages = [
+        {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+        {"role": "user", "content": f"User Request: {user_input}"},
+    ]
     try:
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant that parses user requests into structured JSON. Identify the intent and extract parameters."},
-            {"role": "user", "content": f"""
-            Analyze the following user request to identify the intent and extract relevant parameters.
-            The intent should be 'create_resource' or 'create_github_action'.
-            
-            For 'create_resource' intent, parameters should include 'resource_type' (string, e.g., 'resource group', 'virtual machine', 'storage account', 'aks cluster') and other relevant parameters for the resource.
-            
-            For 'create_github_action' intent, parameters should include 'action_name' (string), 'trigger' (string, e.g., 'push', 'pull_request'), and 'workflow_description' (string, a brief description of what the action should do).
-            
-            Respond in JSON format. If a parameter is not found, omit it.
-            
-            Example for 'create_resource' (resource group):
-            {{"intent": "create_resource", "parameters": {{"resource_type": "resource group", "name": "my-rg", "location": "eastus"}}}}
-            
-            Example for 'create_github_action':
-            {{"intent": "create_github_action", "parameters": {{"action_name": "deploy-app", "trigger": "push", "workflow_description": "Build and deploy a Node.js application to Azure App Service."}}}}
-            User Request: {user_input}
-            """}
-        ]
-        
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",  # You can choose a different model like "gpt-4" if available
-            messages=messages,
-            response_format={ "type": "json_object" }
-        )
-        
-        parsed_json = json.loads(response.choices[0].message.content)
+        result = get_llm_client().complete_json(messages, on_field=on_field)
+        parsed_json = result["parsed"]
+        parameters = parsed_json.get("parameters")
+        # The LLM may answer with an alias ("vm", "API Gateway"); use the registry name
+        if isinstance(parameters, dict) and resolve_resource_type(parameters.get("resource_type")):
+            parameters["resource_type"] = resolve_resource_type(parameters["resource_type"])
         return parsed_json
-    except Exception as e:
+    except LLMError as e:
         print(f"ERROR: Error parsing intent with LLM: {e}")
-        return {"intent": "unknown"}
\ No newline at end of file
+        return {"intent": "unknown"}
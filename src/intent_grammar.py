@@ -0,0 +1,111 @@
+import re
+
+from src.terraform_templates import TEMPLATE_INDEX
+
+# Deterministic grammar for the common request phrasings. parse_intent_locally() only answers
+# when every word of the request is accounted for; anything else is left to the LLM.
+
+_VERBS = r"(?:please\s+)?(?:can\s+you\s+)?(?:create|make|provision|deploy|add|set\s+up|spin\s+up|i\s+need|i\s+want)"
+_ARTICLES = r"(?:(?:an?|the|new|one|azure|me)\s+)*"
+
+# Resource type names and aliases come from the Terraform template registry
+RESOURCE_TYPE_WORDS = TEMPLATE_INDEX
+
+_RESOURCE_TYPES = "|".join(word.replace(" ", r"\s+") for word in sorted(RESOURCE_TYPE_WORDS, key=len, reverse=True))
+_RESOURCE_RE = re.compile(rf"^{_VERBS}\s+{_ARTICLES}(?:(?P<instances>\d+)\s+)?(?P<type>{_RESOURCE_TYPES})\b(?P<rest>.*)$", re.IGNORECASE)
+_RESOURCE_WORD_RE = re.compile(rf"\b(?P<type>{_RESOURCE_TYPES})\b", re.IGNORECASE)
+_ACTION_WORD_RE = re.compile(r"\b(?:github|action|workflow|pipeline)s?\b", re.IGNORECASE)
+
+_LOCATION = r"(?P<location>(?:(?:north|south|east|west|central)\s+)*[a-z]+(?:\s*\d)?)"
+_VALUE = r"[A-Za-z0-9][\w.-]*"
+
+# Clauses are tried in order at the start of the remaining text
+_RESOURCE_CLAUSES = [
+    re.compile(r"^(?:,|(?:and|with|using)\b)", re.IGNORECASE),
+    re.compile(rf"^(?:in|under)\s+(?:the\s+)?(?:resource\s+group|rg)\s+(?P<resource_group_name>{_VALUE})", re.IGNORECASE),
+    re.compile(rf"^(?:named|called|name)\s+(?P<name>{_VALUE})", re.IGNORECASE),
+    re.compile(rf"^(?:size|sku)\s+(?P<size>{_VALUE})", re.IGNORECASE),
+    re.compile(r"^(?P<instances>\d+)\s+(?:instances|vms|virtual\s+machines|machines|nodes)\b", re.IGNORECASE),
+    re.compile(r"^(?:instances|count)\s+(?P<instances>\d+)\b", re.IGNORECASE),
+    re.compile(rf"^(?:os\s+image|image|os)\s+(?P<os_image>{_VALUE})", re.IGNORECASE),
+    re.compile(r"^(?:account\s+tier|tier)\s+(?P<account_tier>standard|premium)\b", re.IGNORECASE),
+    re.compile(r"^(?:replication(?:\s+type)?)\s+(?P<account_replication_type>lrs|grs|ragrs|zrs|gzrs|ragzrs)\b", re.IGNORECASE),
+    re.compile(r"^publisher\s+email\s+(?P<publisher_email>\S+@\S+)", re.IGNORECASE),
+    re.compile(rf"^publisher\s+name\s+(?P<publisher_name>{_VALUE})", re.IGNORECASE),
+    re.compile(rf"^(?:in|at)\s+(?:the\s+)?(?:location|region)?\s*{_LOCATION}(?:\s+(?:region|location))?(?![\w.-])", re.IGNORECASE),
+    re.compile(rf"^(?:location|region)\s+{_LOCATION}(?![\w.-])", re.IGNORECASE),
+]
+# Enumerated values are written the way the azurerm provider expects them
+_CANONICAL = {"account_tier": str.capitalize, "account_replication_type": str.upper}
+_BARE_NAME = re.compile(rf"^(?P<name>{_VALUE})", re.IGNORECASE)
+_KEYWORDS = {
+    "in", "at", "with", "using", "named", "called", "name", "and", "size", "image", "os", "tier", "for", "on", "to",
+    "of", "not", "no", "without", "from", "into", "but", "except", "like", "please", "that", "which",
+}
+
+_ACTION_RE = re.compile(
+    rf"^{_VERBS}\s+{_ARTICLES}(?:github\s+)?(?:action|workflow|pipeline)"
+    rf"(?:\s+(?:named|called))?(?:\s+(?P<action_name>{_VALUE}))?"
+    r"(?:\s+(?:on|triggered\s+(?:on|by)|that\s+runs\s+on|for)\s+(?P<trigger>push|pull[\s_]request|workflow_dispatch|schedule|release)(?:es|s)?)?"
+    r"(?:\s+(?:to|that|which)\s+(?P<workflow_description>.+))?$",
+    re.IGNORECASE,
+)
+
+
+def _parse_resource(match):
+    parameters = {"resource_type": RESOURCE_TYPE_WORDS[re.sub(r"\s+", " ", match.group("type").lower())]}
+    if match.group("instances"):
+        parameters["instances"] = match.group("instances")
+    rest = match.group("rest").strip().rstrip(".!")
+    # A bare word is only taken as the name right after the type ("create resource group my-rg");
+    # anywhere else it is something the grammar does not understand ("a vm with ubuntu")
+    bare_name_allowed = True
+    while rest:
+        for clause in _RESOURCE_CLAUSES:
+            clause_match = clause.match(rest)
+            if clause_match:
+                break
+        else:
+            clause_match = _BARE_NAME.match(rest) if bare_name_allowed else None
+            if not clause_match or clause_match.group("name").lower() in _KEYWORDS:
+                return None
+        bare_name_allowed = False
+        for key, value in clause_match.groupdict().items():
+            if value is not None:
+                if key in parameters:
+                    return None  # Conflicting values: let the LLM sort it out
+                parameters[key] = _CANONICAL.get(key, str)(value)
+        rest = rest[clause_match.end():].strip()
+    return {"intent": "create_resource", "parameters": parameters}
+
+
+def _parse_github_action(match):
+    parameters = {}
+    for key, value in match.groupdict().items():
+        if value:
+            parameters[key] = value.strip().rstrip(".")
+    if "trigger" in parameters:
+        parameters["trigger"] = re.sub(r"\s+", "_", parameters["trigger"].lower())
+    return {"intent": "create_github_action", "parameters": parameters}
+
+
+def parse_intent_locally(user_input):
+    text = " ".join(user_input.split())
+    match = _RESOURCE_RE.match(text)
+    if match:
+        return _parse_resource(match)
+    match = _ACTION_RE.match(text)
+    if match:
+        return _parse_github_action(match)
+    return None
+
+
+def predict_resource_type(user_input):
+    # Loose guess used only for prefetching while the real parse runs: the first resource type
+    # word anywhere in the request. Wrong guesses just waste a lookup.
+    if _ACTION_WORD_RE.search(user_input):
+        return None
+    match = _RESOURCE_WORD_RE.search(user_input)
+    if not match:
+        return None
+    return RESOURCE_TYPE_WORDS[re.sub(r"\s+", " ", match.group("type").lower())]
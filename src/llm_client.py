@@ -0,0 +1,253 @@
+import copy
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from src.config import (
+    LLM_CONNECT_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_MODEL,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_TIMEOUT,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+)
+from src.tracing import span
+
+
+class LLMError(Exception):
+    pass
+
+
+class StreamingJSONFields:
+    # Incremental scanner over a streamed JSON object. on_field(path, value) is called for every
+    # string value as soon as its closing quote arrives, e.g. (("intent",), "create_resource")
+    # or (("parameters", "resource_type"), "virtual machine"), long before the object is complete.
+    def __init__(self, on_field):
+        self.on_field = on_field
+        self._containers = []  # (kind, key) for each open object/array
+        self._key = None
+        self._expect_value = False
+        self._in_string = False
+        self._escape = False
+        self._token = []
+
+    def feed(self, text):
+        for char in text:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string()
+                    continue
+                self._token.append(char)
+            elif char == '"':
+                self._in_string = True
+                self._token = []
+            elif char in "{[":
+                self._containers.append((char, self._key if self._expect_value else None))
+                self._key = None
+                self._expect_value = False
+            elif char in "}]":
+                if self._containers:
+                    self._containers.pop()
+                self._key = None
+                self._expect_value = False
+            elif char == ":":
+                self._expect_value = True
+            elif char == ",":
+                self._key = None
+                self._expect_value = False
+
+    def _end_string(self):
+        if not self._containers or self._containers[-1][0] != "{":
+            return
+        try:
+            value = json.loads('"' + "".join(self._token) + '"')
+        except json.JSONDecodeError:
+            return
+        if not self._expect_value:
+            self._key = value
+            return
+        path = tuple(key for _, key in self._containers[1:]) + (self._key,)
+        self._key = None
+        self._expect_value = False
+        if None not in path:
+            self.on_field(path, value)
+
+
+def _retry_delay(error, attempt):
+    # Rate limits say how long to wait; otherwise full jitter on an exponential backoff
+    response = getattr(error, "response", None)
+    headers = response.headers if response is not None else {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return min(float(value) * scale, LLM_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+    return random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _is_retryable(error):
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in (408, 409)
+
+
+class LLMClient:
+    def __init__(self, api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, model=LLM_MODEL, max_retries=LLM_MAX_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_retries = max_retries
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0, "retries": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_s": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _openai(self):
+        # One client (and so one HTTP connection pool) for the whole process. The SDK's own
+        # retries are off because complete_json retries with jitter and Retry-After.
+        with self._client_lock:
+            if self._client is None:
+                import openai
+
+                self._client = openai.OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url or None,
+                    timeout=openai.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                    max_retries=0,
+                )
+            return self._client
+
+    def _count(self, **amounts):
+        with self._stats_lock:
+            for name, amount in amounts.items():
+                self._stats[name] += amount
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def complete_json(self, messages, on_field=None):
+        # Returns {"content", "parsed", "prompt_tokens", "completion_tokens", "latency_s",
+        # "first_token_s", "attempts"}. Identical requests already in flight share one API call;
+        # only the caller that started it gets on_field callbacks.
+        key = hashlib.sha256(json.dumps([self.model, messages], sort_keys=True).encode("utf-8")).hexdigest()
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self._count(coalesced=1)
+            # Callers edit the parsed parameters in place, so each one gets its own copy
+            return copy.deepcopy(future.result())
+
+        try:
+            result = self._complete_with_retries(messages, on_field)
+            future.set_result(copy.deepcopy(result))
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+    def _complete_with_retries(self, messages, on_field):
+        if not self.api_key:
+            raise LLMError("OPENAI_API_KEY not found in .env file or environment variables.")
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self._stream_completion(messages, on_field)
+                result["attempts"] = attempt + 1
+                return result
+            except LLMError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    self._count(failures=1)
+                    raise LLMError(f"LLM request failed after {attempt + 1} attempt(s): {e}") from e
+                delay = _retry_delay(e, attempt)
+                self._count(retries=1)
+                print(f"Warning: LLM request failed ({e}). Retrying in {delay:.2f}s...")
+                time.sleep(delay)
+
+    def _stream_completion(self, messages, on_field):
+        scanner = StreamingJSONFields(on_field) if on_field else None
+        with span("llm.chat_completion", model=self.model) as llm_span:
+            start = time.perf_counter()
+            first_token_s = None
+            usage = None
+            parts = []
+            stream = self._openai().chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if not text:
+                    continue
+                if first_token_s is None:
+                    first_token_s = time.perf_counter() - start
+                parts.append(text)
+                if scanner:
+                    scanner.feed(text)
+            latency_s = time.perf_counter() - start
+
+            content = "".join(parts)
+            try:
+                parsed = json.loads(content)
+            except json.JSONDecodeError as e:
+                raise LLMError(f"LLM returned invalid JSON: {e}")
+            result = {
+                "content": content,
+                "parsed": parsed,
+                "prompt_tokens": usage.prompt_tokens if usage else 0,
+                "completion_tokens": usage.completion_tokens if usage else 0,
+                "latency_s": latency_s,
+                "first_token_s": first_token_s,
+            }
+            self._count(calls=1, prompt_tokens=result["prompt_tokens"], completion_tokens=result["completion_tokens"], latency_s=latency_s)
+            if llm_span.recording:
+                llm_span.set(
+                    bytes_out=sum(len(message["content"]) for message in messages),
+                    bytes_in=len(content),
+                    prompt_tokens=result["prompt_tokens"],
+                    completion_tokens=result["completion_tokens"],
+                    first_token_ms=round(first_token_s * 1000, 3) if first_token_s is not None else None,
+                )
+            return result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
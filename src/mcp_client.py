@@ -0,0 +1,303 @@
+import atexit
+import itertools
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+
+from src.config import (
+    AZURE_MCP_COMMAND,
+    MCP_HEALTH_CHECK_INTERVAL,
+    MCP_REQUEST_TIMEOUT,
+    MCP_TRANSPORT,
+    TERRAFORM_MCP_SERVER_URL,
+)
+from src.process_runner import NON_INTERACTIVE_ENV, OutputCapture
+from src.tracing import span
+
+MCP_PROTOCOL_VERSION = "2024-11-05"
+MCP_STDERR_LIMIT = 16 * 1024
+CLIENT_INFO = {"name": "agent-ai-devops", "version": "0.1.0"}
+
+
+class MCPError(Exception):
+    pass
+
+
+class MCPToolError(MCPError):
+    # The server answered, but the tool itself reported a failure. The session is still healthy.
+    pass
+
+
+class StdioMCPSession:
+    def __init__(self, command):
+        self.command = command
+        self._process = None
+        self._ids = itertools.count(1)
+        # Requests are multiplexed over one pipe: each in-flight request id gets its own queue,
+        # so a slow tool call does not hold up a concurrent one.
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stderr = OutputCapture(MCP_STDERR_LIMIT)
+
+    def start(self):
+        # The server is long-lived, so it keeps its own pipes rather than going through the
+        # process runner, but it shares the runner's non-interactive env and capped output capture
+        self._stderr = OutputCapture(MCP_STDERR_LIMIT)
+        self._process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            env={**os.environ, **NON_INTERACTIVE_ENV},
+        )
+        threading.Thread(target=self._read_loop, args=(self._process,), daemon=True).start()
+        threading.Thread(target=self._stderr_loop, args=(self._process, self._stderr), daemon=True).start()
+        self.request("initialize", {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": CLIENT_INFO,
+        })
+        self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _read_loop(self, process):
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                # Some servers log banners to stdout; only JSON-RPC frames matter here.
+                continue
+            with self._pending_lock:
+                # Notifications and late answers to requests that already timed out have no waiter
+                waiter = self._pending.pop(message.get("id"), None)
+            if waiter is not None:
+                waiter.put(message)
+        with self._pending_lock:
+            waiters = list(self._pending.values())
+            self._pending.clear()
+        for waiter in waiters:
+            waiter.put(None)
+
+    @staticmethod
+    def _stderr_loop(process, capture):
+        # Drained continuously so a chatty server never blocks on a full pipe
+        for line in process.stderr:
+            capture.append(line)
+
+    def _exited_error(self):
+        tail = self._stderr.text().strip()
+        return MCPError("MCP server process exited" + (f"; stderr:\n{tail[-2000:]}" if tail else ""))
+
+    def _send(self, message):
+        try:
+            with self._write_lock:
+                self._process.stdin.write(json.dumps(message) + "\n")
+                self._process.stdin.flush()
+        except (BrokenPipeError, OSError, AttributeError) as e:
+            raise MCPError(f"MCP server stdin closed: {e}")
+
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def request(self, method, params=None, timeout=MCP_REQUEST_TIMEOUT):
+        request_id = next(self._ids)
+        waiter = queue.Queue(maxsize=1)
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+        try:
+            if not self.is_alive():
+                raise self._exited_error()
+            self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}})
+            try:
+                message = waiter.get(timeout=timeout)
+            except queue.Empty:
+                raise MCPError(f"Timed out after {timeout}s waiting for MCP '{method}'")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+        if message is None:
+            raise self._exited_error()
+        if message.get("error"):
+            raise MCPError(f"MCP '{method}' failed: {message['error']}")
+        return message.get("result", {})
+
+    def close(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.terminate()
+            self._process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._process = None
+
+
+class HttpMCPSession:
+    def __init__(self, url):
+        self.url = url
+        self._http = None
+        self._session_id = None
+        self._ids = itertools.count(1)
+
+    def start(self):
+        import requests
+
+        self._http = requests.Session()
+        self._session_id = None
+        self.request("initialize", {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": CLIENT_INFO,
+        })
+        self._post({"jsonrpc": "2.0", "method": "notifications/initialized"}, MCP_REQUEST_TIMEOUT)
+
+    def _post(self, payload, timeout):
+        import requests
+
+        headers = {"Accept": "application/json, text/event-stream"}
+        if self._session_id:
+            headers["Mcp-Session-Id"] = self._session_id
+        try:
+            response = self._http.post(self.url, json=payload, headers=headers, timeout=timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise MCPError(f"MCP HTTP request to {self.url} failed: {e}")
+        self._session_id = response.headers.get("Mcp-Session-Id", self._session_id)
+        return response
+
+    def is_alive(self):
+        return self._http is not None
+
+    def request(self, method, params=None, timeout=MCP_REQUEST_TIMEOUT):
+        request_id = next(self._ids)
+        response = self._post({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}}, timeout)
+
+        if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            messages = []
+            for line in response.text.splitlines():
+                if line.startswith("data:"):
+                    try:
+                        messages.append(json.loads(line[len("data:"):].strip()))
+                    except json.JSONDecodeError:
+                        continue
+        else:
+            messages = [response.json()]
+
+        for message in messages:
+            if message.get("id") != request_id:
+                continue
+            if message.get("error"):
+                raise MCPError(f"MCP '{method}' failed: {message['error']}")
+            return message.get("result", {})
+        raise MCPError(f"No MCP response for '{method}' from {self.url}")
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+
+def _tool_result_text(result):
+    return "".join(item.get("text", "") for item in result.get("content", []) if item.get("type") == "text")
+
+
+def _tool_result_json(result, text):
+    if result.get("isError"):
+        raise MCPToolError(text or "MCP tool reported an error")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise MCPToolError(f"MCP tool returned non-JSON content: {e}")
+
+
+class MCPClient:
+    def __init__(self, session_factory, health_check_interval=MCP_HEALTH_CHECK_INTERVAL):
+        self._session_factory = session_factory
+        self._health_check_interval = health_check_interval
+        self._session = None
+        self._last_ok = 0.0
+        self._lock = threading.Lock()
+
+    def _ensure_session(self):
+        with self._lock:
+            if self._session is not None and self._session.is_alive():
+                if time.monotonic() - self._last_ok < self._health_check_interval:
+                    return self._session
+                try:
+                    self._session.request("ping", timeout=5)
+                    self._last_ok = time.monotonic()
+                    return self._session
+                except MCPError as e:
+                    print(f"Warning: MCP health check failed ({e}). Restarting session...")
+            self._restart_locked()
+            return self._session
+
+    def _restart_locked(self):
+        if self._session is not None:
+            self._session.close()
+        session = self._session_factory()
+        with span("mcp.session_start", transport=MCP_TRANSPORT):
+            session.start()
+        self._session = session
+        self._last_ok = time.monotonic()
+
+    def ensure_started(self):
+        self._ensure_session()
+
+    def call_tool(self, name, arguments):
+        with span("mcp.call_tool", tool=name) as call_span:
+            session = None
+            try:
+                session = self._ensure_session()
+                result = session.request("tools/call", {"name": name, "arguments": arguments})
+            except MCPToolError:
+                raise
+            except (MCPError, OSError) as e:
+                # One transparent restart covers a crashed or wedged server; a second failure is real.
+                # Concurrent calls see the same failure, so only the first one to get here restarts;
+                # the others retry on the session it started.
+                print(f"Warning: MCP call '{name}' failed ({e}). Restarting session and retrying...")
+                call_span.set(restarted=True)
+                with self._lock:
+                    if self._session is None or self._session is session or not self._session.is_alive():
+                        self._restart_locked()
+                    session = self._session
+                result = session.request("tools/call", {"name": name, "arguments": arguments})
+            self._last_ok = time.monotonic()
+            text = _tool_result_text(result)
+            call_span.set(bytes_in=len(text))
+            return _tool_result_json(result, text)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_mcp_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            if MCP_TRANSPORT == "http":
+                _client = MCPClient(lambda: HttpMCPSession(TERRAFORM_MCP_SERVER_URL))
+            else:
+                _client = MCPClient(lambda: StdioMCPSession(AZURE_MCP_COMMAND))
+            atexit.register(_client.close)
+        return _client
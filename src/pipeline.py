@@ -0,0 +1,90 @@
+import re
+
+from src.azure_utils import get_location_catalog
+from src.github_actions_generator import WORKFLOW_SPEC_KEYS, generate_github_action_workflow
+from src.terraform_generator import generate_terraform_code
+
+
+def ask_interactively(param_name, param_info):
+    return input(f"{param_info['prompt']} ")
+
+
+def collect_resource_parameters(schema, parameters, ask, interactive=True):
+    # Fills missing required parameters in place using ask(param_name, param_info), which returns
+    # a value or None. Returns the names of required parameters that are still missing.
+    location_catalog = get_location_catalog()
+
+    # Normalize a location the user already gave (e.g. "East US", "india")
+    if "location" in schema and parameters.get("location") and location_catalog.names():
+        resolved_location = location_catalog.resolve(parameters["location"])
+        if resolved_location:
+            parameters["location"] = resolved_location
+        else:
+            print(f"'{parameters['location']}' is not a known Azure location.")
+            del parameters["location"]
+
+    missing = []
+    for param_name, param_info in schema.items():
+        if not param_info["required"] or param_name in parameters:
+            continue
+
+        user_provided_value = ask(param_name, param_info)
+        if param_name == "location" and user_provided_value is not None:
+            if not location_catalog.names():
+                print("Warning: Could not retrieve valid Azure locations. Proceeding without validation.")
+            else:
+                while True:
+                    resolved_location = location_catalog.resolve(user_provided_value)
+                    if resolved_location:
+                        user_provided_value = resolved_location
+                        break
+                    suggestions = location_catalog.suggest(user_provided_value)
+                    if suggestions:
+                        print(f"Invalid location '{user_provided_value}'. Did you mean: {', '.join(suggestions)}?")
+                    else:
+                        print(f"Invalid location '{user_provided_value}'. Please choose from: {', '.join(location_catalog.names()[:10])}...")
+                    if not interactive:
+                        user_provided_value = None
+                        break
+                    user_provided_value = ask(param_name, param_info)
+
+        if user_provided_value is None:
+            missing.append(param_name)
+        else:
+            parameters[param_name] = user_provided_value
+    return missing
+
+
+def resource_branch_name(resource_type, parameters):
+    return f"feat-azure-{resource_type.replace(' ', '-').replace('/', '-')}-{parameters.get('name')}"
+
+
+def resource_file_name(resource_type, parameters):
+    # One file per requested resource keeps edits and diffs small as the repository grows
+    slug = re.sub(r"[^a-z0-9]+", "-", f"{resource_type}-{parameters.get('name')}".lower()).strip("-")
+    return f"{slug}.tf"
+
+
+def build_resource_change(resource_type, parameters):
+    tf_code_to_add = generate_terraform_code(resource_type, parameters)
+    return resource_branch_name(resource_type, parameters), tf_code_to_add, resource_file_name(resource_type, parameters)
+
+
+def build_github_action_change(action_name, trigger, workflow_description, spec=None):
+    # spec holds the structured workflow options (WORKFLOW_SPEC_KEYS); missing ones are inferred
+    # from the description
+    workflow_content = generate_github_action_workflow(action_name, trigger, workflow_description, spec)
+    slug = action_name.lower().replace(' ', '-')
+    # Define the target file path for the GitHub Action workflow
+    target_file_path = f".github/workflows/{slug}.yml"
+    return f"feat-github-action-{slug}", workflow_content, target_file_path
+
+
+def workflow_spec(parameters, defaults=None):
+    defaults = defaults or {}
+    spec = {}
+    for key in WORKFLOW_SPEC_KEYS:
+        value = parameters.get(key, defaults.get(key))
+        if value is not None:
+            spec[key] = value
+    return spec
@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.tracing import span
+
+# Speculative background work for the interactive flow. The git fetch and location catalog start
+# as soon as the prompt is shown, and the schema lookup starts as soon as the resource type is
+# known or guessed. The foreground only waits for results it actually needs, so a request costs
+# roughly its slowest stage instead of the sum of all of them.
+
+
+def _sync_workspace():
+    from src.git_manager import get_workspace
+    # Runs while input() waits, so git output would land on top of the prompt
+    return get_workspace().sync(quiet=True)
+
+
+def _load_locations():
+    from src.azure_utils import get_location_catalog
+    get_location_catalog().ensure_loaded()
+    return True
+
+
+def _fetch_schema(resource_type):
+    from src.terraform_generator import get_resource_schema_from_mcp
+    return get_resource_schema_from_mcp(resource_type)
+
+
+class Prefetcher:
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, key, fn, *args):
+        with self._lock:
+            if key not in self._futures:
+                self._futures[key] = self._executor.submit(self._run, key, fn, *args)
+            return self._futures[key]
+
+    @staticmethod
+    def _run(key, fn, *args):
+        with span("prefetch", task=key[0]):
+            return fn(*args)
+
+    def warm_up(self):
+        # Needed by every resource request whatever its type
+        self._submit(("workspace",), _sync_workspace)
+        self._submit(("locations",), _load_locations)
+
+    def prefetch_schema(self, resource_type):
+        if resource_type:
+            self._submit(("schema", resource_type), _fetch_schema, resource_type)
+
+    def schema(self, resource_type):
+        # The speculative lookup if one was started for this type, otherwise a fresh one
+        return self._submit(("schema", resource_type), _fetch_schema, resource_type).result()
+
+    def close(self):
+        # Let in-flight work finish in the background; nothing waits on it any more
+        self._executor.shutdown(wait=False, cancel_futures=True)
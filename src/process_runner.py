@@ -0,0 +1,232 @@
+import asyncio
+import atexit
+import collections
+import os
+import signal
+import threading
+import time
+
+from src.config import COMMAND_MAX_CONCURRENCY, COMMAND_OUTPUT_LIMIT, COMMAND_TIMEOUT
+from src.tracing import adopt_span, current_span, span
+
+# Shared runner for external commands (git, gh). Commands run as asyncio subprocesses on one event
+# loop in a background thread; callers on any thread submit() and get a concurrent Future back, or
+# run() and block. A global semaphore bounds how many processes run at once, every command has a
+# timeout, and output is captured line by line with a size cap.
+
+READ_CHUNK = 64 * 1024
+KILL_GRACE_SECONDS = 5
+RECORDS_KEPT = 1000
+
+# Never let git or gh wait for a password or confirmation nobody will type
+NON_INTERACTIVE_ENV = {"GIT_TERMINAL_PROMPT": "0", "GH_PROMPT_DISABLED": "1", "GCM_INTERACTIVE": "never"}
+
+
+class OutputCapture:
+    # Keeps the last `limit` bytes of a stream as whole lines; the tail is what explains a failure
+    def __init__(self, limit=COMMAND_OUTPUT_LIMIT):
+        self.limit = limit
+        self.lines = collections.deque()
+        self.size = 0
+        self.total = 0
+        self.truncated = False
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            self.lines.append(line)
+            self.size += len(line)
+            self.total += len(line)
+            while self.size > self.limit and len(self.lines) > 1:
+                self.size -= len(self.lines.popleft())
+                self.truncated = True
+
+    def text(self):
+        with self._lock:
+            prefix = "[... earlier output truncated ...]\n" if self.truncated else ""
+            return prefix + "".join(self.lines)
+
+
+class CommandResult:
+    def __init__(self, command, returncode, stdout, stderr, duration, timed_out=False, not_found=False, truncated=False):
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+        self.not_found = not_found
+        self.truncated = truncated
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+
+class ProcessRunner:
+    def __init__(self, max_concurrency=COMMAND_MAX_CONCURRENCY, default_timeout=COMMAND_TIMEOUT, output_limit=COMMAND_OUTPUT_LIMIT):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.output_limit = output_limit
+        self.records = collections.deque(maxlen=RECORDS_KEPT)
+        self._loop = None
+        self._semaphore = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                started = threading.Event()
+
+                def run_loop():
+                    asyncio.set_event_loop(self._loop)
+                    self._loop.call_soon(started.set)
+                    self._loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name="process-runner", daemon=True)
+                self._thread.start()
+                started.wait()
+            return self._loop
+
+    def submit(self, command, cwd=None, timeout=None, on_line=None):
+        # on_line(stream_name, line) is called from the runner thread as output arrives.
+        # Cancelling the returned future kills the process.
+        loop = self._ensure_loop()
+        # The command span belongs under whatever span the caller has open (batch.item, ...)
+        coroutine = self._run(list(command), cwd, timeout or self.default_timeout, on_line, current_span())
+        return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    def run(self, command, cwd=None, timeout=None, on_line=None):
+        return self.submit(command, cwd, timeout, on_line).result()
+
+    async def _run(self, command, cwd, timeout, on_line, parent_span):
+        # Each task runs in its own copy of the context, so this does not leak into other commands
+        adopt_span(parent_span)
+        async with self._semaphore:
+            with span("command", command=" ".join(command[:2])) as command_span:
+                result = await self._execute(command, cwd, timeout, on_line)
+                if result.not_found:
+                    command_span.set(outcome="not_found")
+                elif result.timed_out:
+                    command_span.set(outcome="timeout")
+                elif result.returncode != 0:
+                    command_span.set(outcome="failed", exit_code=result.returncode)
+                else:
+                    command_span.set(bytes_in=len(result.stdout) + len(result.stderr))
+        self.records.append({
+            "command": " ".join(command),
+            "cwd": cwd,
+            "returncode": result.returncode,
+            "duration_s": round(result.duration, 3),
+            "timed_out": result.timed_out,
+            "stdout_bytes": len(result.stdout),
+            "stderr_bytes": len(result.stderr),
+            "finished_at": time.time(),
+        })
+        return result
+
+    async def _execute(self, command, cwd, timeout, on_line):
+        start = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=cwd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env={**os.environ, **NON_INTERACTIVE_ENV},
+                # Own process group, so a timeout also stops helpers git spawns (ssh, remote-https)
+                start_new_session=True,
+            )
+        except FileNotFoundError as e:
+            return CommandResult(command, 127, "", str(e), time.monotonic() - start, not_found=True)
+
+        stdout = OutputCapture(self.output_limit)
+        stderr = OutputCapture(self.output_limit)
+        readers = asyncio.gather(
+            self._pump(process.stdout, stdout, "stdout", on_line),
+            self._pump(process.stderr, stderr, "stderr", on_line),
+        )
+
+        async def communicate():
+            await readers
+            await process.wait()
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(communicate(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            await self._kill(process)
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+        finally:
+            if not readers.done():
+                readers.cancel()
+        return CommandResult(
+            command,
+            process.returncode,
+            stdout.text(),
+            stderr.text(),
+            time.monotonic() - start,
+            timed_out=timed_out,
+            truncated=stdout.truncated or stderr.truncated,
+        )
+
+    @staticmethod
+    async def _pump(stream, capture, name, on_line):
+        pending = b""
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                text = line.decode("utf-8", errors="replace") + "\n"
+                capture.append(text)
+                if on_line:
+                    on_line(name, text)
+        if pending:
+            text = pending.decode("utf-8", errors="replace")
+            capture.append(text)
+            if on_line:
+                on_line(name, text)
+
+    @staticmethod
+    async def _kill(process):
+        # Signal the whole group: a surviving child would keep the pipes, and so wait(), open
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop = None
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_process_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = ProcessRunner()
+            atexit.register(_runner.close)
+        return _runner
@@ -0,0 +1,189 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from src.config import SCHEMA_BUNDLE_PATH
+
+# Bundle layout: header, open-addressing slot table, then one JSON record per resource type.
+# Lookups hash the key, probe the memory-mapped slot table and decode a single record, so only
+# the pages that are actually touched ever become resident.
+BUNDLE_MAGIC = b"AZSB"
+BUNDLE_VERSION = 1
+HEADER = struct.Struct("<4sHHI")  # magic, version, reserved, slot count
+SLOT = struct.Struct("<QII")  # key hash (0 = empty), record offset, record length
+
+
+def _key_hash(key):
+    value = int.from_bytes(hashlib.blake2b(key.lower().encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+def content_hash(bicep_schema):
+    return hashlib.sha256(json.dumps(bicep_schema, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def write_schema_bundle(records, path=SCHEMA_BUNDLE_PATH):
+    slot_count = 1
+    while slot_count < max(len(records), 1) * 2:
+        slot_count *= 2
+
+    slots = [(0, 0, 0)] * slot_count
+    data = bytearray()
+    data_start = HEADER.size + SLOT.size * slot_count
+    for record in records:
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        key_hash = _key_hash(record["resource_type"])
+        index = key_hash % slot_count
+        while slots[index][0] != 0:
+            index = (index + 1) % slot_count
+        slots[index] = (key_hash, data_start + len(data), len(payload))
+        data += payload
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, 0, slot_count))
+        for slot in slots:
+            f.write(SLOT.pack(*slot))
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SchemaBundle:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._slot_count = HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} schema bundle")
+        # Revalidations against the live source are kept in a sidecar file, so a record whose hash
+        # still matches is not checked again by every cold start once it is older than the TTL
+        self._checked_path = f"{path}.checked.json"
+        self._checked = None
+        self._checked_lock = threading.Lock()
+
+    def _load_checked_locked(self):
+        if self._checked is None:
+            try:
+                with open(self._checked_path) as f:
+                    self._checked = json.load(f)
+            except (OSError, ValueError):
+                self._checked = {}
+        return self._checked
+
+    def checked_at(self, record):
+        # When the record was last known to match the live schema
+        with self._checked_lock:
+            entry = self._load_checked_locked().get(record["resource_type"].lower())
+        if entry and entry.get("content_hash") == record["content_hash"]:
+            return max(record["fetched_at"], entry["checked_at"])
+        return record["fetched_at"]
+
+    def mark_checked(self, record):
+        with self._checked_lock:
+            checked = self._load_checked_locked()
+            checked[record["resource_type"].lower()] = {"content_hash": record["content_hash"], "checked_at": time.time()}
+            tmp_path = f"{self._checked_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(checked, f)
+                os.replace(tmp_path, self._checked_path)
+            except OSError as e:
+                print(f"Warning: Could not save schema revalidation to {self._checked_path}: {e}")
+
+    def get(self, resource_type):
+        key_hash = _key_hash(resource_type)
+        index = key_hash % self._slot_count
+        for _ in range(self._slot_count):
+            slot_hash, offset, length = SLOT.unpack_from(self._map, HEADER.size + index * SLOT.size)
+            if slot_hash == 0:
+                return None
+            if slot_hash == key_hash:
+                record = json.loads(self._map[offset:offset + length])
+                if record["resource_type"].lower() == resource_type.lower():
+                    return record
+            index = (index + 1) % self._slot_count
+        return None
+
+    def __len__(self):
+        count = 0
+        for index in range(self._slot_count):
+            if SLOT.unpack_from(self._map, HEADER.size + index * SLOT.size)[0] != 0:
+                count += 1
+        return count
+
+    def close(self):
+        self._map.close()
+
+
+_bundle = None
+_bundle_lock = threading.Lock()
+
+
+def get_schema_bundle():
+    global _bundle
+    with _bundle_lock:
+        if _bundle is None and os.path.exists(SCHEMA_BUNDLE_PATH):
+            try:
+                _bundle = SchemaBundle(SCHEMA_BUNDLE_PATH)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not open schema bundle {SCHEMA_BUNDLE_PATH}: {e}")
+        return _bundle
+
+
+def build_schema_bundle(resource_types, path=SCHEMA_BUNDLE_PATH):
+    from src.terraform_generator import build_agent_schema, fetch_bicep_schema
+    from src.terraform_templates import TEMPLATE_REGISTRY
+
+    # The first registry entry for a Bicep type names its record
+    friendly_names = {}
+    for name, template in TEMPLATE_REGISTRY.items():
+        friendly_names.setdefault(template.bicep_type.lower(), name)
+    records = []
+    for bicep_resource_type in resource_types:
+        try:
+            bicep_schema = fetch_bicep_schema(bicep_resource_type)
+        except Exception as e:
+            print(f"Warning: Skipping {bicep_resource_type}: {e}")
+            continue
+        friendly_name = friendly_names.get(bicep_resource_type.lower(), bicep_resource_type)
+        records.append({
+            "resource_type": bicep_resource_type,
+            "schema": build_agent_schema(friendly_name, bicep_schema),
+            "content_hash": content_hash(bicep_schema),
+            "fetched_at": time.time(),
+        })
+        print(f"Fetched schema for {bicep_resource_type}")
+
+    write_schema_bundle(records, path)
+    print(f"Wrote {len(records)} schemas to {path}")
+    return len(records)
+
+
+def main(argv=None):
+    from src.terraform_generator import RESOURCE_TYPE_MAP
+
+    parser = argparse.ArgumentParser(description="Snapshot Azure Bicep schemas into an offline bundle.")
+    parser.add_argument("--types-file", help="File with one Bicep resource type per line (defaults to the known resource types)")
+    parser.add_argument("--output", default=SCHEMA_BUNDLE_PATH, help="Bundle path to write")
+    args = parser.parse_args(argv)
+
+    if args.types_file:
+        with open(args.types_file) as f:
+            resource_types = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    else:
+        resource_types = sorted(set(RESOURCE_TYPE_MAP.values()))
+
+    return 0 if build_schema_bundle(resource_types, args.output) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
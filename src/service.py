@@ -0,0 +1,126 @@
+import json
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.azure_utils import get_location_catalog
+from src.batch import process_batch_item
+from src.config import AGENT_SERVICE_MAX_CONCURRENCY
+from src.git_manager import get_workspace
+from src.intent_analyzer import get_intent_stats
+from src.mcp_client import get_mcp_client
+from src.schema_bundle import get_schema_bundle
+from src.tracing import tracer
+
+# Long-running agent: the MCP session, schema bundle, location catalog, intent cache and git clone
+# are warmed once and shared by every request. Each request still gets its own git worktree.
+#
+#   POST /provision  {"request": "create resource group my-rg in eastus"}
+#                    {"intent": "create_resource", "parameters": {...}, "defaults": {...}}
+#   GET  /health
+#   GET  /metrics    (Prometheus text format)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def warm_up():
+    print("Warming up: MCP session, schema bundle, location catalog and git workspace...")
+    get_schema_bundle()
+    try:
+        get_mcp_client().ensure_started()
+    except Exception as e:
+        print(f"Warning: Could not start MCP session during warm-up: {e}")
+    get_location_catalog().ensure_loaded()
+    get_workspace().sync(force=True)
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    server_version = "AgentAIDevOps/0.1"
+    slots = threading.BoundedSemaphore(AGENT_SERVICE_MAX_CONCURRENCY)
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "intent_stats": get_intent_stats()})
+        elif self.path == "/metrics":
+            body = tracer.metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/provision":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Invalid Content-Length header"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "Request body too large"})
+            return
+        try:
+            item = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+        if not isinstance(item, dict) or not (item.get("request") or item.get("intent")):
+            self._send_json(400, {"error": "Body must be an object with 'request' or 'intent'"})
+            return
+
+        with self.slots:
+            result = process_batch_item(item, item.get("defaults", {}))
+        # Another request is still publishing the same branch
+        status = {"success": 200, "branch_in_use": 409}.get(result["status"], 422)
+        self._send_json(status, result)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def serve(host="127.0.0.1", port=8080, socket_path=None):
+    # Always aggregate span metrics for /metrics, even when no trace or metrics file is configured
+    tracer.enabled = True
+    warm_up()
+    if socket_path:
+        server = UnixHTTPServer(socket_path, AgentRequestHandler)
+        print(f"Agent service listening on unix:{socket_path}")
+    else:
+        server = ThreadingHTTPServer((host, port), AgentRequestHandler)
+        print(f"Agent service listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down agent service.")
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,42 @@
+# Reusable fleet of identical Linux VMs on a shared subnet. The root module calls it once per
+# distinct configuration (for_each) and each call creates instance_count VMs (count).
+
+resource "azurerm_network_interface" "this" {
+  count               = var.instance_count
+  name                = format("%s-%03d-nic", var.name_prefix, count.index + 1)
+  location            = var.location
+  resource_group_name = var.resource_group_name
+
+  ip_configuration {
+    name                          = "internal"
+    subnet_id                     = var.subnet_id
+    private_ip_address_allocation = "Dynamic"
+  }
+}
+
+resource "azurerm_linux_virtual_machine" "this" {
+  count                 = var.instance_count
+  name                  = format("%s-%03d", var.name_prefix, count.index + 1)
+  resource_group_name   = var.resource_group_name
+  location              = var.location
+  size                  = var.size
+  admin_username        = var.admin_username
+  network_interface_ids = [azurerm_network_interface.this[count.index].id]
+
+  os_disk {
+    caching              = "ReadWrite"
+    storage_account_type = var.os_disk_storage_account_type
+  }
+
+  source_image_reference {
+    publisher = "Canonical"
+    offer     = "UbuntuServer"
+    sku       = var.os_image
+    version   = "latest"
+  }
+
+  admin_ssh_key {
+    username   = var.admin_username
+    public_key = var.admin_ssh_public_key
+  }
+}
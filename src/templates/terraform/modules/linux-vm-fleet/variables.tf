@@ -0,0 +1,43 @@
+variable "name_prefix" {
+  type        = string
+  description = "VM names are <name_prefix>-001, <name_prefix>-002, ..."
+}
+
+variable "instance_count" {
+  type = number
+}
+
+variable "size" {
+  type = string
+}
+
+variable "os_image" {
+  type        = string
+  description = "UbuntuServer image SKU, e.g. 18.04-LTS"
+}
+
+variable "location" {
+  type = string
+}
+
+variable "resource_group_name" {
+  type = string
+}
+
+variable "subnet_id" {
+  type = string
+}
+
+variable "admin_username" {
+  type    = string
+  default = "azureuser"
+}
+
+variable "admin_ssh_public_key" {
+  type = string
+}
+
+variable "os_disk_storage_account_type" {
+  type    = string
+  default = "Standard_LRS"
+}
@@ -1,193 +1,133 @@
-import json
-import subprocess
+import time
+
+from src.config import AZURE_MCP_SCHEMA_TOOL, SCHEMA_BUNDLE_TTL
+from src.mcp_client import MCPError, get_mcp_client
+from src.schema_bundle import content_hash, get_schema_bundle
+from src.terraform_templates import TEMPLATE_INDEX, TEMPLATE_REGISTRY, get_template, normalize_resource_type
+from src.tracing import span
+
+# Every resource type name and alias (normalized) -> Bicep type
+RESOURCE_TYPE_MAP = {word: TEMPLATE_REGISTRY[resource_type].bicep_type for word, resource_type in TEMPLATE_INDEX.items()}
+
+SCALAR_SCHEMA_TYPES = ("string", "int", "bool")
+
+def fetch_bicep_schema(bicep_resource_type):
+    # Ask the long-lived Azure MCP session for the Bicep schema
+    mcp_response = get_mcp_client().call_tool(AZURE_MCP_SCHEMA_TOOL, {"resource-type": bicep_resource_type})
+
+    if mcp_response.get("error"):
+        raise MCPError(f"{mcp_response['error']}")
+
+    return mcp_response["results"]["BicepSchemaResult"][0]["bodyType"]
+
+def _is_required(prop_dict):
+    # Bicep type flags: 1 = Required
+    return bool(prop_dict.get("isRequired")) or bool(prop_dict.get("flags", 0) & 1)
+
+def build_agent_schema(resource_type, bicep_schema):
+    # Simplified parsing of Bicep schema to agent's schema format
+    schema = {}
+    properties = bicep_schema.get("properties", {})
+
+    for prop_dict in properties:
+        prop_name = prop_dict.get("name")
+        prop_type = prop_dict.get("type")
+
+        # Basic extraction for common properties
+        if prop_name == "name":
+            schema["name"] = {"type": "string", "required": True, "prompt": f"What would you like to name the {resource_type}?"}
+        elif prop_name == "location":
+            schema["location"] = {"type": "string", "required": True, "prompt": "What Azure region should it be created in? (e.g., eastus, westus2)"}
+        elif prop_name == "resourceGroup": # Bicep uses resourceGroup, Terraform uses resource_group_name
+            schema["resource_group_name"] = {"type": "string", "required": True, "prompt": "What is the name of the resource group?"}
+        elif _is_required(prop_dict) and prop_type in SCALAR_SCHEMA_TYPES:
+            schema[prop_name] = {"type": prop_type, "required": True, "prompt": f"What value should {prop_name} have?"}
+
+    return _apply_template_parameters(resource_type, schema)
+
+def _apply_template_parameters(resource_type, schema):
+    # Add the parameters the Terraform template needs that the Bicep schema does not cover, and
+    # drop the ones the template fills with a default. Several templates can share one Bicep type
+    # (and so one bundle record), e.g. "virtual machine" and "virtual machine fleet".
+    template = get_template(resource_type)
+    if not template:
+        return schema
+    schema = dict(schema)
+    for param_name, param_info in template.parameters.items():
+        if param_info["required"] and param_name not in schema:
+            schema[param_name] = {"type": param_info["type"], "required": True, "prompt": param_info["prompt"]}
+        elif not param_info["required"] and param_info.get("default") is not None:
+            schema.pop(param_name, None)
+    return schema
+
+def _schema_from_bundle(resource_type, bicep_resource_type):
+    bundle = get_schema_bundle()
+    record = bundle.get(bicep_resource_type) if bundle else None
+    if not record:
+        return None
+
+    if time.time() - bundle.checked_at(record) < SCHEMA_BUNDLE_TTL:
+        return _apply_template_parameters(resource_type, record["schema"])
+
+    # The bundled record is older than the TTL: compare its content hash with the live schema
+    try:
+        bicep_schema = fetch_bicep_schema(bicep_resource_type)
+    except Exception as e:
+        print(f"Warning: Could not revalidate bundled schema for {bicep_resource_type} ({e}). Using bundled copy.")
+        return _apply_template_parameters(resource_type, record["schema"])
+
+    if content_hash(bicep_schema) == record["content_hash"]:
+        bundle.mark_checked(record)
+        return _apply_template_parameters(resource_type, record["schema"])
 
-from src.config import TERRAFORM_MCP_SERVER_URL
+    print(f"Warning: Schema for {bicep_resource_type} changed since the bundle was built. Run 'python -m src.schema_bundle' to refresh it.")
+    return build_agent_schema(resource_type, bicep_schema)
 
 def get_resource_schema_from_mcp(resource_type):
     try:
-        resource_type_map = {
-            "resource group": "Microsoft.Resources/resourceGroups",
-            "virtual machine": "Microsoft.Compute/virtualMachines",
-            "storage account": "Microsoft.Storage/storageAccounts",
-            "API gateway": "Microsoft.ApiManagement/service",
-        }
-        
-        bicep_resource_type = resource_type_map.get(resource_type)
+        # Only types with a Terraform template can be generated; anything else (including a raw
+        # Bicep type such as Microsoft.Network/virtualNetworks) is rejected before any prompting
+        bicep_resource_type = RESOURCE_TYPE_MAP.get(normalize_resource_type(resource_type))
         if not bicep_resource_type:
-            print(f"Error: No Bicep resource type mapping for {resource_type}")
+            print(f"Error: No Terraform template for resource type '{resource_type}'. Supported types: {', '.join(sorted(TEMPLATE_REGISTRY))}")
             return None
 
-        # Execute the npx command to get the Bicep schema
-        command = ["npx", "-y", "@azure/mcp@latest", "bicepschema", "get", "--resource-type", bicep_resource_type]
-        process = subprocess.run(command, capture_output=True, text=True, check=True)
-        print(f"DEBUG: npx stdout: {process.stdout}")
-        print(f"DEBUG: npx stderr: {process.stderr}")
-        
-        mcp_response = json.loads(process.stdout)
-        print(f"DEBUG: MCP Response: {mcp_response}")
-        
-        if mcp_response.get("error"):
-            print(f"Error from Azure MCP: {mcp_response['error']}")
-            return None
-
-        bicep_schema = mcp_response["results"]["BicepSchemaResult"][0]["bodyType"]
-        print(f"DEBUG: Bicep Schema: {bicep_schema}")
-
-        # Simplified parsing of Bicep schema to agent's schema format
-        schema = {}
-        properties = bicep_schema.get("properties", {})
-
-        for prop_dict in properties:
-            prop_name = prop_dict.get("name")
-            prop_details = prop_dict # Use the whole dictionary for details
-
-            # Basic extraction for common properties
-            if prop_name == "name":
-                schema["name"] = {"type": "string", "required": True, "prompt": f"What would you like to name the {resource_type}?"}
-            elif prop_name == "location":
-                schema["location"] = {"type": "string", "required": True, "prompt": "What Azure region should it be created in? (e.g., eastus, westus2)"}
-            elif prop_name == "resourceGroup": # Bicep uses resourceGroup, Terraform uses resource_group_name
-                schema["resource_group_name"] = {"type": "string", "required": True, "prompt": "What is the name of the resource group?"}
-            # Add more property parsing as needed for other resource types
-            # This is a very simplified parser and will need to be expanded
-
-        # Add specific properties based on resource type (if not found in Bicep schema or for simplicity)
-        if resource_type == "virtual machine":
-            if "os_image" not in schema: schema["os_image"] = {"type": "string", "required": True, "prompt": "What OS image should it use? (e.g., UbuntuServer, WindowsServer)"}
-            if "size" not in schema: schema["size"] = {"type": "string", "required": True, "prompt": "What size should the VM be? (e.g., Standard_B1s, Standard_DS1_v2)"}
-        elif resource_type == "storage account":
-            if "account_tier" not in schema: schema["account_tier"] = {"type": "string", "required": True, "prompt": "What account tier? (e.g., Standard, Premium)"}
-            if "account_replication_type" not in schema: schema["account_replication_type"] = {"type": "string", "required": True, "prompt": "What replication type? (e.g., LRS, GRS, RAGRS, ZRS)"}
-        elif resource_type == "API gateway":
-            if "publisher_email" not in schema: schema["publisher_email"] = {"type": "string", "required": True, "prompt": "What is the publisher email for the API Gateway?"}
-            if "publisher_name" not in schema: schema["publisher_name"] = {"type": "string", "required": True, "prompt": "What is the publisher name for the API Gateway?"}
+        with span("schema.lookup", resource_type=bicep_resource_type) as lookup_span:
+            schema = _schema_from_bundle(resource_type, bicep_resource_type)
+            if schema is not None:
+                lookup_span.set(source="bundle")
+                return schema
 
-        return schema
+            lookup_span.set(source="mcp")
+            bicep_schema = fetch_bicep_schema(bicep_resource_type)
+            return build_agent_schema(resource_type, bicep_schema)
 
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing npx command: {e.stderr}")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from npx output: {e}")
+    except MCPError as e:
+        print(f"Error calling Azure MCP: {e}")
         return None
     except Exception as e:
         print(f"Error getting resource schema from MCP: {e}")
         return None
 
-def generate_terraform_code(resource_type, parameters):
-    tf_code = ""
-
-    # Generate Terraform based on resource type
-    if resource_type == "resource group":
-        name = parameters.get("name")
-        location = parameters.get("location")
-        tf_code = f"""
-resource \"azurerm_resource_group\" \"main\" {{
-  name     = \"{name}\" 
-  location = \"{location}\" 
-}}"""
-    elif resource_type == "virtual machine":
-        vm_name = parameters.get("name")
-        os_image = parameters.get("os_image")
-        vm_size = parameters.get("size")
-        vm_location = parameters.get("location")
-        resource_group_name = parameters.get("resource_group_name")
-
-        tf_code = f"""
-resource \"azurerm_resource_group\" \"vm_rg\" {{
-  name     = \"{resource_group_name}\" 
-  location = \"{vm_location}\" 
-}}
-
-resource \"azurerm_virtual_network\" \"vm_vnet\" {{
-  name                = \"{vm_name}-vnet\"
-  address_space       = [\"10.0.0.0/16\"]
-  location            = azurerm_resource_group.vm_rg.location
-  resource_group_name = azurerm_resource_group.vm_rg.name
-}}
-
-resource \"azurerm_subnet\" \"vm_subnet\" {{
-  name                 = \"{vm_name}-subnet\"
-  resource_group_name  = azurerm_resource_group.vm_rg.name
-  virtual_network_name = azurerm_virtual_network.vm_vnet.name
-  address_prefixes     = [\"10.0.1.0/24\"]
-}}
-
-resource \"azurerm_network_interface\" \"vm_nic\" {{
-  name                = \"{vm_name}-nic\"
-  location            = azurerm_resource_group.vm_rg.location
-  resource_group_name = azurerm_resource_group.vm_rg.name
-
-  ip_configuration {{
-    name                          = \"internal\"
-    subnet_id                     = azurerm_subnet.vm_subnet.id
-    private_ip_address_allocation = \"Dynamic\"
-  }}
-}}
-
-resource \"azurerm_linux_virtual_machine\" \"main\" {{
-  name                  = \"{vm_name}\" 
-  resource_group_name   = azurerm_resource_group.vm_rg.name
-  location              = azurerm_resource_group.vm_rg.location
-  size                  = \"{vm_size}\" 
-  admin_username        = \"azureuser\"
-  network_interface_ids = [azurerm_network_interface.vm_nic.id]
-
-  os_disk {{
-    caching              = \"ReadWrite\"
-    storage_account_type = \"Standard_LRS\"
-  }}
-
-  source_image_reference {{
-    publisher = \"Canonical\"
-    offer     = \"UbuntuServer\"
-    sku       = \"{os_image}\" 
-    version   = \"latest\"
-  }}
-
-  admin_ssh_key {{
-    username   = \"azureuser\"
-    public_key = \"ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQD3b3+...\"
-  }}
-}}
-"""
-    elif resource_type == "storage account":
-        name = parameters.get("name")
-        location = parameters.get("location")
-        account_tier = parameters.get("account_tier")
-        account_replication_type = parameters.get("account_replication_type")
-        resource_group_name = parameters.get("resource_group_name")
-        tf_code = f"""
-resource \"azurerm_resource_group\" \"storage_rg\" {{
-  name     = \"{resource_group_name}\" 
-  location = \"{location}\" 
-}}
-
-resource \"azurerm_storage_account\" \"main\" {{
-  name                     = \"{name}\" 
-  resource_group_name      = azurerm_resource_group.storage_rg.name
-  location                 = azurerm_resource_group.storage_rg.location
-  account_tier             = \"{account_tier}\" 
-  account_replication_type = \"{account_replication_type}\" 
-}}
-"""
-    elif resource_type == "API gateway":
-        name = parameters.get("name")
-        resource_group_name = parameters.get("resource_group_name")
-        location = parameters.get("location")
-        publisher_email = parameters.get("publisher_email")
-        publisher_name = parameters.get("publisher_name")
-        tf_code = f"""
-resource \"azurerm_api_management\" \"main\" {{
-  name                = \"{name}\" 
-  location            = \"{location}\" 
-  resource_group_name = \"{resource_group_name}\" 
-  publisher_name      = \"{publisher_name}\" 
-  publisher_email     = \"{publisher_email}\" 
-
-  sku_name = \"Developer_1\" 
-}}
-"""
-    else:
+def generate_terraform_code(resource_type, parameters, stream=None):
+    # Renders into stream when given (and returns None), otherwise returns the code as a string
+    template = get_template(resource_type)
+    if not template:
         tf_code = "# Unknown resource type, no Terraform code generated.\n"
+    else:
+        try:
+            with span("terraform.render", resource_type=resource_type) as render_span:
+                if stream is not None:
+                    template.render_to(stream, parameters)
+                    return None
+                tf_code = template.render(parameters)
+                render_span.set(bytes_out=len(tf_code))
+                return tf_code
+        except ValueError as e:
+            print(f"Error: {e}")
+            tf_code = f"# {e}, no Terraform code generated.\n"
+
+    if stream is not None:
+        stream.write(tf_code)
+        return None
     return tf_code
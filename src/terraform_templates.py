@@ -0,0 +1,190 @@
+import io
+import json
+import os
+import re
+
+from src.hcl_merge import label_from_name
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "terraform")
+REGISTRY_FILE = os.path.join(TEMPLATES_DIR, "registry.json")
+
+# {{parameter}} or {{parameter|filter}}
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+(?:\|\w+)?)\s*\}\}")
+_MODULE_SOURCE_RE = re.compile(r'^[ \t]*source[ \t]*=[ \t]*"\./modules/([\w-]+)"', re.MULTILINE)
+
+
+def _hcl_escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("${", "$${")
+
+
+def _slug(value):
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-")
+
+
+def fleet_configurations(instances, parameters):
+    # instances is a count ("200") or a list of {"name", "size", "os_image", "count"} entries, as
+    # Python objects or JSON text. Entries with the same size and image are merged, so the result
+    # has one {"size", "os_image", "count"} entry per distinct configuration, keyed by name.
+    if isinstance(instances, str):
+        text = instances.strip()
+        instances = int(text) if text.isdigit() else json.loads(text)
+    if isinstance(instances, int):
+        instances = [{"count": instances}]
+    if not isinstance(instances, list):
+        raise ValueError("instances must be a count or a list of {size, os_image, count} entries")
+
+    configurations = {}
+    keys = {}
+    for entry in instances:
+        if not isinstance(entry, dict):
+            raise ValueError(f"Invalid instances entry: {entry!r}")
+        size = entry.get("size") or parameters.get("size")
+        os_image = entry.get("os_image") or parameters.get("os_image")
+        count = int(entry.get("count", 1))
+        if count < 0:
+            raise ValueError(f"Invalid instance count {count}")
+        identity = (size, os_image)
+        key = keys.get(identity)
+        if key is None:
+            key = _slug(entry.get("name") or size)
+            if not entry.get("name") and key in configurations:
+                key = _slug(f"{size}-{os_image}")
+            if not key or key in configurations:
+                raise ValueError(f"Duplicate or empty fleet configuration name '{key}'")
+            keys[identity] = key
+            configurations[key] = {"size": size, "os_image": os_image, "count": 0}
+        configurations[key]["count"] += count
+    configurations = {key: config for key, config in configurations.items() if config["count"]}
+    if not configurations:
+        raise ValueError("A fleet needs at least one instance")
+    return configurations
+
+
+def _format_instances(value, parameters):
+    lines = []
+    for key, config in fleet_configurations(value, parameters).items():
+        lines.append(
+            f'    "{_hcl_escape(key)}" = {{ size = "{_hcl_escape(config["size"])}", '
+            f'os_image = "{_hcl_escape(config["os_image"])}", count = {config["count"]} }}'
+        )
+    return "\n".join(lines)
+
+
+# How each registry parameter type is written into a template. Structured types render HCL
+# expressions rather than quoted strings.
+_PARAMETER_FORMATTERS = {
+    "instances": _format_instances,
+}
+
+# Filters for one placeholder, applied to the raw value: {{name|label}} is a valid block label
+# ("web fleet" -> web_fleet) where {{name}} is an escaped string
+_PLACEHOLDER_FILTERS = {
+    "label": label_from_name,
+}
+
+
+class TerraformTemplate:
+    def __init__(self, resource_type, bicep_type, parameters, emits, text, aliases=()):
+        self.resource_type = resource_type
+        self.bicep_type = bicep_type
+        self.parameters = parameters
+        self.emits = emits
+        self.aliases = list(aliases)
+        # Compiled form: literal text at even indices, placeholders at odd indices
+        self._segments = _PLACEHOLDER_RE.split(text)
+        self._filtered = {segment: tuple(segment.split("|")) for segment in self._segments[1::2] if "|" in segment}
+        undeclared = {segment.split("|")[0] for segment in self._segments[1::2]} - set(parameters)
+        if undeclared:
+            raise ValueError(f"Template for {resource_type} uses undeclared parameters: {', '.join(sorted(undeclared))}")
+        unknown = {filter_name for _, filter_name in self._filtered.values()} - set(_PLACEHOLDER_FILTERS)
+        if unknown:
+            raise ValueError(f"Template for {resource_type} uses unknown filters: {', '.join(sorted(unknown))}")
+
+    def resolve_parameters(self, parameters):
+        raw = {}
+        for param_name, param_info in self.parameters.items():
+            value = parameters.get(param_name)
+            if value is None:
+                value = param_info.get("default")
+            if value is None:
+                raise ValueError(f"Missing parameter '{param_name}' for {self.resource_type}")
+            raw[param_name] = value
+
+        values = {}
+        for param_name, value in raw.items():
+            formatter = _PARAMETER_FORMATTERS.get(self.parameters[param_name].get("type"))
+            values[param_name] = formatter(value, raw) if formatter else _hcl_escape(value)
+        for segment, (param_name, filter_name) in self._filtered.items():
+            values[segment] = _PLACEHOLDER_FILTERS[filter_name](raw[param_name])
+        return values
+
+    def render_to(self, stream, parameters):
+        values = self.resolve_parameters(parameters)
+        segments = self._segments
+        for index, segment in enumerate(segments):
+            stream.write(values[segment] if index % 2 else segment)
+
+    def render(self, parameters):
+        stream = io.StringIO()
+        self.render_to(stream, parameters)
+        return stream.getvalue()
+
+
+def load_template_registry(registry_file=REGISTRY_FILE):
+    with open(registry_file) as f:
+        entries = json.load(f)
+
+    registry = {}
+    for resource_type, entry in entries.items():
+        with open(os.path.join(os.path.dirname(registry_file), entry["template"])) as f:
+            text = f.read()
+        registry[resource_type] = TerraformTemplate(
+            resource_type,
+            entry["bicep_type"],
+            entry.get("parameters", {}),
+            entry.get("emits", []),
+            text,
+            entry.get("aliases", []),
+        )
+    return registry
+
+
+def normalize_resource_type(name):
+    return " ".join(str(name).lower().split())
+
+
+def build_template_index(registry):
+    # Normalized resource type names and aliases -> registry key ("vm", "API Gateway", ...)
+    index = {}
+    for resource_type, template in registry.items():
+        for word in [resource_type, *template.aliases]:
+            index.setdefault(normalize_resource_type(word), resource_type)
+    return index
+
+
+# Loaded and compiled once; lookups are plain dict accesses
+TEMPLATE_REGISTRY = load_template_registry()
+TEMPLATE_INDEX = build_template_index(TEMPLATE_REGISTRY)
+
+
+def resolve_resource_type(name):
+    # The registry key for a resource type name or alias, whatever its case or spacing
+    return TEMPLATE_INDEX.get(normalize_resource_type(name)) if name else None
+
+
+def get_template(resource_type):
+    return TEMPLATE_REGISTRY.get(resolve_resource_type(resource_type))
+
+
+def bundled_module_files(code):
+    # {path relative to the .tf file: content} for every bundled module (templates/terraform/modules)
+    # that code calls through a local "./modules/<name>" source
+    files = {}
+    for module in sorted(set(_MODULE_SOURCE_RE.findall(code))):
+        module_dir = os.path.join(TEMPLATES_DIR, "modules", module)
+        if not os.path.isdir(module_dir):
+            continue
+        for file_name in sorted(os.listdir(module_dir)):
+            with open(os.path.join(module_dir, file_name)) as f:
+                files[f"modules/{module}/{file_name}"] = f.read()
+    return files
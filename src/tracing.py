@@ -0,0 +1,171 @@
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+
+from src.config import AGENT_METRICS_FILE, AGENT_TRACE_FILE
+
+# Span durations are bucketed for the Prometheus histogram (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _NoopSpan:
+    recording = False
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+# The innermost open span. A context variable rather than a thread-local, so coroutines sharing one
+# event loop thread (the process runner) each see their own parent instead of one interleaved stack.
+_current_span = contextvars.ContextVar("agent_current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, trace_file=None, metrics_file=None):
+        self.trace_file = trace_file
+        self.metrics_file = metrics_file
+        self.enabled = bool(trace_file or metrics_file)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._trace_stream = None
+        self._durations = {}
+        self._bytes = {}
+        self.trace_id = f"{os.getpid()}-{int(time.time())}"
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def _record(self, span, duration, outcome):
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start_time,
+            "duration_ms": round(duration * 1000, 3),
+            "outcome": outcome,
+            **span.attributes,
+        }
+        with self._lock:
+            if self.trace_file:
+                if self._trace_stream is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.trace_file)), exist_ok=True)
+                    self._trace_stream = open(self.trace_file, "a")
+                self._trace_stream.write(json.dumps(record, default=str) + "\n")
+                self._trace_stream.flush()
+
+            histogram = self._durations.setdefault((span.name, outcome), [0] * len(DURATION_BUCKETS) + [0, 0.0])
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    histogram[index] += 1
+            histogram[-2] += 1
+            histogram[-1] += duration
+            for direction in ("bytes_in", "bytes_out"):
+                if direction in span.attributes:
+                    key = (span.name, direction)
+                    self._bytes[key] = self._bytes.get(key, 0) + span.attributes[direction]
+
+    def metrics_text(self):
+        lines = [
+            "# HELP agent_span_duration_seconds Duration of agent pipeline stages.",
+            "# TYPE agent_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            durations = {key: list(value) for key, value in self._durations.items()}
+            byte_counts = dict(self._bytes)
+        for (name, outcome), histogram in sorted(durations.items()):
+            labels = f'stage="{name}",outcome="{outcome}"'
+            for bound, count in zip(DURATION_BUCKETS, histogram):
+                lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram[-2]}')
+            lines.append(f"agent_span_duration_seconds_count{{{labels}}} {histogram[-2]}")
+            lines.append(f"agent_span_duration_seconds_sum{{{labels}}} {histogram[-1]:.6f}")
+        lines.append("# HELP agent_span_bytes_total Bytes sent to and received from external tools per stage.")
+        lines.append("# TYPE agent_span_bytes_total counter")
+        for (name, direction), count in sorted(byte_counts.items()):
+            lines.append(f'agent_span_bytes_total{{stage="{name}",direction="{direction[len("bytes_"):]}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self):
+        if not self.metrics_file:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.metrics_file)), exist_ok=True)
+        tmp_path = f"{self.metrics_file}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.metrics_text())
+        os.replace(tmp_path, self.metrics_file)
+
+    def close(self):
+        self.write_metrics()
+        with self._lock:
+            if self._trace_stream is not None:
+                self._trace_stream.close()
+                self._trace_stream = None
+
+
+class Span:
+    recording = True
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = next(tracer._ids)
+        self.parent_id = None
+        self.start_time = None
+        self._start = None
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self._token = _current_span.set(self)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            outcome = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        else:
+            outcome = self.attributes.pop("outcome", "ok")
+        self.tracer._record(self, duration, outcome)
+        return False
+
+
+tracer = Tracer(AGENT_TRACE_FILE, AGENT_METRICS_FILE)
+if tracer.enabled:
+    atexit.register(tracer.close)
+
+
+def span(name, **attributes):
+    return tracer.span(name, **attributes)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def adopt_span(parent):
+    # Makes parent the current span in this context, for work handed to another thread or task
+    _current_span.set(parent)
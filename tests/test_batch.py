@@ -0,0 +1,16 @@
+import io
+
+from src.batch import iter_batch_items, run_batch
+
+
+def test_jsonl_lines_that_are_not_objects_become_error_items():
+    items = list(iter_batch_items(io.StringIO('5\n[1, 2]\n"create resource group my-rg in eastus"\n')))
+
+    assert [entry["id"] for kind, entry in items] == ["line-1", "line-2", "line-3"]
+    assert "error" in items[0][1] and "error" in items[1][1]
+    assert items[2][1]["request"] == "create resource group my-rg in eastus"
+
+
+def test_missing_batch_file_is_reported(tmp_path, capsys):
+    assert run_batch(str(tmp_path / "missing.jsonl")) is None
+    assert "Could not read batch file" in capsys.readouterr().err
@@ -0,0 +1,50 @@
+import subprocess
+
+import pytest
+
+from src.git_manager import BranchInUseError, GitWorkspace
+
+
+def git(*args, cwd=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    remote = tmp_path / "remote.git"
+    seed = tmp_path / "seed"
+    git("init", "--bare", "-b", "main", str(remote))
+    git("init", "-b", "main", str(seed))
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "--allow-empty", "-m", "init", cwd=seed)
+    git("push", str(remote), "main", cwd=seed)
+    return GitWorkspace(str(tmp_path / "clone"), str(remote), str(tmp_path / "worktrees"), fetch_interval=60)
+
+
+def test_branch_in_use_is_rejected_until_released(workspace):
+    first = workspace.prepare_branch("feature/a")
+
+    with pytest.raises(BranchInUseError):
+        workspace.prepare_branch("feature/a")
+
+    workspace.release(first, "feature/a")
+    second = workspace.prepare_branch("feature/a")
+    assert second and second != first
+    workspace.release(second, "feature/a")
+
+
+def test_each_branch_gets_its_own_directory(workspace):
+    first = workspace.prepare_branch("feature-a")
+    second = workspace.prepare_branch("feature-b")
+
+    assert first != second
+    workspace.release(first, "feature-a")
+    workspace.release(second, "feature-b")
+
+
+def test_quiet_sync_prints_only_on_failure(workspace, tmp_path, capsys):
+    assert workspace.sync(quiet=True)
+    assert capsys.readouterr().out == ""
+
+    broken = GitWorkspace(str(tmp_path / "other"), str(tmp_path / "missing.git"), str(tmp_path / "wt"), fetch_interval=60)
+    assert not broken.sync(quiet=True)
+    assert "git clone" in capsys.readouterr().out
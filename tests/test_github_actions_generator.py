@@ -0,0 +1,32 @@
+import pytest
+
+from src.github_actions_generator import _trigger_events, build_workflow
+
+
+def test_trigger_words_become_events_and_branches():
+    assert _trigger_events("push to main") == (["push"], ["main"])
+    assert _trigger_events("pushes and pull requests to main or develop") == (["push", "pull_request"], ["main", "develop"])
+
+
+def test_trigger_without_an_event_is_rejected():
+    with pytest.raises(ValueError):
+        _trigger_events("on commit")
+
+
+def test_trigger_branch_is_used_for_push():
+    workflow = build_workflow("ci", "push to staging", "run pytest")
+
+    assert workflow["on"]["push"]["branches"] == ["staging"]
+
+
+def test_unknown_language_is_not_a_terraform_workflow():
+    with pytest.raises(ValueError):
+        build_workflow("ci", "push", "Lint my rust package with cargo clippy")
+
+    workflow = build_workflow("ci", "push", "Run the tests", {"test_command": "cargo test"})
+    assert list(workflow["jobs"]) == ["test"]
+    assert "paths" not in workflow["on"]["push"]
+
+
+def test_terraform_is_still_generated_when_asked_for():
+    assert "terraform-apply" in build_workflow("infra", "push", "apply terraform infra")["jobs"]
@@ -0,0 +1,113 @@
+from src.hcl_merge import merge_terraform, scan_blocks
+
+STORAGE = '''
+resource "azurerm_resource_group" "storage_rg" {
+  name     = "{rg}"
+  location = "{location}"
+}
+
+resource "azurerm_storage_account" "main" {
+  name                     = "{account}"
+  resource_group_name      = azurerm_resource_group.storage_rg.name
+  location                 = azurerm_resource_group.storage_rg.location
+  account_tier             = "{tier}"
+  account_replication_type = "LRS"
+}
+'''
+
+
+def storage(rg, account, tier="Standard", location="eastus"):
+    return STORAGE.replace("{rg}", rg).replace("{account}", account).replace("{tier}", tier).replace("{location}", location)
+
+
+def addresses(text):
+    return [block.address for block in scan_blocks(text)]
+
+
+def test_new_blocks_are_labelled_after_their_name(tmp_path):
+    changed = merge_terraform(str(tmp_path), storage("rg-a", "sa1"), "new.tf")
+
+    assert addresses(changed["new.tf"]) == ["resource.azurerm_resource_group.rg_a", "resource.azurerm_storage_account.sa1"]
+    assert "azurerm_resource_group.rg_a.name" in changed["new.tf"]
+
+
+def test_requests_off_the_same_main_never_share_an_address(tmp_path):
+    # Two requests branched off the same (empty) main each write their own file
+    first = merge_terraform(str(tmp_path), storage("rg-a", "sa1"), "first.tf")["first.tf"]
+    second = merge_terraform(str(tmp_path), storage("rg-b", "sa2"), "second.tf")["second.tf"]
+
+    assert not set(addresses(first)) & set(addresses(second))
+
+
+def test_label_collision_with_a_different_resource_gets_a_suffix(tmp_path):
+    (tmp_path / "main.tf").write_text('resource "azurerm_resource_group" "rg_a" {\n  name = "rg_a"\n  location = "westus"\n}\n')
+
+    changed = merge_terraform(str(tmp_path), storage("rg-a", "sa1"), "new.tf")
+
+    assert "resource.azurerm_resource_group.rg_a_2" in addresses(changed["new.tf"])
+    assert "azurerm_resource_group.rg_a_2.name" in changed["new.tf"]
+    assert "main.tf" not in changed
+
+
+def test_same_labels_in_one_input_are_renamed_per_block(tmp_path):
+    code = storage("rg-a", "sa1") + storage("rg-b", "sa2")
+
+    text = merge_terraform(str(tmp_path), code, "new.tf")["new.tf"]
+
+    assert addresses(text) == [
+        "resource.azurerm_resource_group.rg_a",
+        "resource.azurerm_storage_account.sa1",
+        "resource.azurerm_resource_group.rg_b",
+        "resource.azurerm_storage_account.sa2",
+    ]
+    blocks = scan_blocks(text)
+    assert "azurerm_resource_group.rg_a.name" in blocks[1].text
+    assert "azurerm_resource_group.rg_b.name" in blocks[3].text
+
+
+def test_existing_resource_is_updated_in_place(tmp_path):
+    (tmp_path / "storage.tf").write_text(storage("rg-a", "sa1").replace('"storage_rg"', '"shared"').replace("storage_rg.", "shared."))
+
+    changed = merge_terraform(str(tmp_path), storage("rg-a", "sa1", tier="Premium"), "new.tf")
+
+    assert list(changed) == ["storage.tf"]
+    assert addresses(changed["storage.tf"]) == ["resource.azurerm_resource_group.shared", "resource.azurerm_storage_account.main"]
+    assert '"Premium"' in changed["storage.tf"]
+    assert "azurerm_resource_group.shared.name" in changed["storage.tf"]
+
+
+def test_same_name_in_another_resource_group_is_a_new_resource(tmp_path):
+    existing = storage("rg-a", "sa1")
+    (tmp_path / "storage.tf").write_text(existing)
+
+    changed = merge_terraform(str(tmp_path), storage("rg-b", "sa1"), "new.tf")
+
+    assert list(changed) == ["new.tf"]
+    assert addresses(changed["new.tf"]) == ["resource.azurerm_resource_group.rg_b", "resource.azurerm_storage_account.sa1"]
+    assert "azurerm_resource_group.rg_b.name" in changed["new.tf"]
+
+
+def test_existing_resource_group_in_another_location_is_kept(tmp_path):
+    (tmp_path / "rg.tf").write_text('resource "azurerm_resource_group" "shared" {\n  name     = "rg-a"\n  location = "eastus"\n}\n')
+
+    changed = merge_terraform(str(tmp_path), storage("rg-a", "sa1", location="westus"), "new.tf")
+
+    assert list(changed) == ["new.tf"]
+    assert addresses(changed["new.tf"]) == ["resource.azurerm_storage_account.sa1"]
+    assert "azurerm_resource_group.shared.name" in changed["new.tf"]
+
+
+def test_large_file_is_split_when_edited(tmp_path):
+    existing = storage("rg-a", "sa1") + "".join(
+        f'resource "azurerm_resource_group" "rg{i}" {{\n  name     = "rg{i}"\n  location = "eastus"\n}}\n\n' for i in range(5)
+    )
+    (tmp_path / "main.tf").write_text(existing)
+
+    changed = merge_terraform(str(tmp_path), storage("rg-a", "sa1", tier="Premium"), "new.tf", split_lines=10)
+
+    assert "new.tf" not in changed
+    assert changed["main.tf"].strip() == ""
+    split = {path: text for path, text in changed.items() if path != "main.tf"}
+    assert len(split) == 7
+    assert any('"Premium"' in text for text in split.values())
+    assert all(len(scan_blocks(text)) == 1 for text in split.values())
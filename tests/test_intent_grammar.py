@@ -0,0 +1,48 @@
+import pytest
+
+from src.intent_grammar import parse_intent_locally
+
+
+def parameters(text):
+    result = parse_intent_locally(text)
+    return result["parameters"] if result else None
+
+
+def test_bare_name_right_after_the_type():
+    assert parameters("create resource group my-rg in eastus") == {
+        "resource_type": "resource group",
+        "name": "my-rg",
+        "location": "eastus",
+    }
+
+
+def test_named_clause_anywhere():
+    assert parameters("create a storage account in westus2 named mysa")["name"] == "mysa"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "create a vm with ubuntu",
+        "create a resource group not in eastus",
+        "create a fleet of 10 vms",
+        "create a storage account in eastus mysa",
+        "create resource group my-rg in eastus please",
+    ],
+)
+def test_leftover_words_are_left_to_the_llm(text):
+    assert parse_intent_locally(text) is None
+
+
+def test_instances_before_the_type():
+    assert parameters("create 10 vms named web") == {"resource_type": "virtual machine fleet", "instances": "10", "name": "web"}
+
+
+def test_enumerated_values_are_canonical():
+    assert parameters("create storage account mysa in eastus, tier premium, replication grs") == {
+        "resource_type": "storage account",
+        "name": "mysa",
+        "location": "eastus",
+        "account_tier": "Premium",
+        "account_replication_type": "GRS",
+    }
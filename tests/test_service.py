@@ -0,0 +1,46 @@
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src import service
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), service.AgentRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(port, body, headers):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.putrequest("POST", "/provision")
+    for name, value in headers.items():
+        connection.putheader(name, value)
+    connection.endheaders()
+    connection.send(body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_malformed_content_length_is_a_bad_request(server):
+    status, payload = post(server, b"{}", {"Content-Length": "abc"})
+
+    assert status == 400
+    assert "Content-Length" in payload["error"]
+
+
+def test_branch_in_use_is_a_conflict(server, monkeypatch):
+    monkeypatch.setattr(service, "process_batch_item", lambda item, defaults: {"id": None, "status": "branch_in_use", "error": "busy"})
+    body = json.dumps({"request": "create resource group my-rg in eastus"}).encode()
+
+    status, payload = post(server, body, {"Content-Length": str(len(body))})
+
+    assert status == 409
+    assert payload["status"] == "branch_in_use"